@@ -0,0 +1,156 @@
+"""
+Benchmark the move choosers: run each player in MoveChooser.methods on
+a fixed set of positions at set depths, recording the nodes searched,
+nodes per second, time to move, peak memory, the move chosen and the
+line of play expected after it, and any search statistics the player
+keeps.
+The results are written as JSON, so runs from different versions of
+the code can be diffed.
+
+Usage:
+    python Benchmark.py --depths 1,2 --output bench.json
+    python Benchmark.py --players AlphaBeta --depths 3
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import inspect
+import tracemalloc
+from contextlib import redirect_stdout
+
+from Chess import Game, START_FEN
+from MoveChooser import methods
+
+## positions to choose a move from: the opening, a crowded middlegame
+## with castling on both sides, a sparse endgame, and a position
+## where there's a mate in one.
+POSITIONS = {
+    "start": START_FEN,
+    "kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R"
+                " w KQkq - 0 1",
+    "endgame": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "mate_in_one": "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+}
+DEFAULT_DEPTHS = [1, 2]
+
+
+def move_str(move):
+    """
+    Move as a string like "E2E4".
+    """
+    start, end = move
+    return "{}{}{}{}".format(start[0], start[1], end[0], end[1])
+
+
+def takes_depth(player_class):
+    """
+    Whether the player's search depth can be set.
+    """
+    return "depth" in inspect.signature(player_class.__init__).parameters
+
+
+def choose_move(player_class, fen, depth, seed):
+    """
+    Set up the position and a new player, and have it choose
+    a move.  Returns the player, the move and the time taken.
+    Anything the player prints is thrown away.
+    """
+    random.seed(seed)
+    with redirect_stdout(io.StringIO()):
+        game = Game()
+        game.load_fen(fen)
+        colour = game.next_to_play
+        if depth is None:
+            player = player_class(colour)
+        else:
+            player = player_class(colour, depth=depth)
+        start_time = time.perf_counter()
+        move = player.choose_move(game)
+        elapsed = time.perf_counter() - start_time
+    return player, move, elapsed
+
+
+def benchmark(player_name, position_name, depth, measure_memory=True,
+              seed=0):
+    """
+    Result of one player choosing a move in one position, as a dict.
+    Peak memory is measured in a second run, so that the overhead
+    of tracing allocations doesn't count in the timing.
+    """
+    player_class = methods[player_name]
+    fen = POSITIONS[position_name]
+    player, move, elapsed = choose_move(player_class, fen, depth, seed)
+    nodes = getattr(player, "nodes", None)
+    result = {"player": player_name,
+              "position": position_name,
+              "depth": depth,
+              "move": move_str(move),
+              "principal_variation": [move_str(m) for m in
+                                      getattr(player, "principal_variation",
+                                              [])],
+              "nodes": nodes,
+              "time": elapsed,
+              "nps": nodes / elapsed if nodes and elapsed > 0 else None,
+              "peak_memory_bytes": None,
+              "stats": dict(getattr(player, "stats", {}))}
+    if measure_memory:
+        tracemalloc.start()
+        choose_move(player_class, fen, depth, seed)
+        result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(players=None, positions=None, depths=DEFAULT_DEPTHS,
+                   measure_memory=True, verbose=True):
+    """
+    Benchmark every combination of player, position and depth.
+    Players that don't search to a depth are run once per position.
+    """
+    players = players or sorted(methods.keys())
+    positions = positions or list(POSITIONS.keys())
+    results = []
+    for player_name in players:
+        player_depths = depths if takes_depth(methods[player_name]) \
+                        else [None]
+        for position_name in positions:
+            for depth in player_depths:
+                result = benchmark(player_name, position_name, depth,
+                                   measure_memory)
+                results.append(result)
+                if verbose:
+                    print("{player} {position} depth {depth}: {move} "
+                          "nodes {nodes} in {time:.3f}s".format(**result),
+                          file=sys.stderr)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark move choosers")
+    parser.add_argument("--players", help="comma-separated names from "
+                        "MoveChooser.methods (default all)")
+    parser.add_argument("--positions", help="comma-separated names of "
+                        "positions (default all)")
+    parser.add_argument("--depths", default=",".join(str(d) for d in
+                                                     DEFAULT_DEPTHS))
+    parser.add_argument("--no-memory", action="store_true",
+                        help="don't measure peak memory")
+    parser.add_argument("--output", help="file to write JSON to "
+                        "(default stdout)")
+    args = parser.parse_args()
+    results = run_benchmarks(
+        players=args.players.split(",") if args.players else None,
+        positions=args.positions.split(",") if args.positions else None,
+        depths=[int(d) for d in args.depths.split(",")],
+        measure_memory=not args.no_memory)
+    output = json.dumps({"python": sys.version.split()[0],
+                         "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as outfile:
+            outfile.write(output + "\n")
+    else:
+        print(output)
@@ -0,0 +1,333 @@
+"""
+Alternative move-generation backend using bitboards.
+
+The position is held as one 64-bit integer per colour and piece type,
+with bit (colnum + 8*(row-1)) set if that square is occupied, so A1 is
+bit 0 and H8 is bit 63.  The Board keeps these up to date as pieces
+are placed, lifted and moved, so they are never rebuilt from scratch.
+Moves and threatened squares for every piece are then found with bit
+operations, and written back onto the pieces as the usual lists of
+(col, row) tuples, so that the rest of the program (legality checks,
+MoveChooser etc.) doesn't need to know which engine generated them.
+After a move, only the pieces that could be affected by the squares
+that changed are worked out again (as with the pieces engine), and
+whether a king's squares are attacked is found by looking outwards
+from each square, rather than by adding up everything the other side
+attacks.
+"""
+
+from Board import COLOURS, SQUARES, SQUARE_INDEX
+from Tables import KNIGHT_STEPS, KING_STEPS, ROOK_DIRECTIONS, \
+    BISHOP_DIRECTIONS, QUEEN_DIRECTIONS, POSITIVE_DIRECTIONS, RAY_MASKS, \
+    first_blocker
+
+FULL = (1 << 64) - 1
+## columns C to G of each side's back row
+CASTLING_PATHS = {"WHITE": 0x7C, "BLACK": 0x7C << 56}
+
+
+def other(colour):
+    """
+    Get the other colour.
+    """
+    return "BLACK" if colour == "WHITE" else "WHITE"
+
+
+def square_index(pos):
+    """
+    Convert a (col, row) tuple to a square index 0-63.
+    """
+    return SQUARE_INDEX[pos]
+
+
+def bit_squares(mask):
+    """
+    Iterate over the indices of the set bits in a mask.
+    """
+    while mask:
+        lsb = mask & -mask
+        yield lsb.bit_length() - 1
+        mask ^= lsb
+
+
+## cache of mask -> tuple of (col, row) positions, since the same
+## masks come up again and again.
+_POSITIONS_CACHE = {}
+
+def mask_positions(mask):
+    """
+    List of (col, row) positions for the set bits in a mask.
+    """
+    positions = _POSITIONS_CACHE.get(mask)
+    if positions is None:
+        if len(_POSITIONS_CACHE) > 100000:
+            _POSITIONS_CACHE.clear()
+        positions = tuple(SQUARES[s] for s in bit_squares(mask))
+        _POSITIONS_CACHE[mask] = positions
+    return list(positions)
+
+
+def _step_mask(sq, steps):
+    """
+    Mask of all squares a single step away from sq, for
+    the given list of (col step, row step).
+    """
+    mask = 0
+    colnum, rownum = sq % 8, sq // 8
+    for dcol, drow in steps:
+        c, r = colnum + dcol, rownum + drow
+        if 0 <= c < 8 and 0 <= r < 8:
+            mask |= 1 << (c + 8*r)
+    return mask
+
+
+KNIGHT_ATTACKS = [_step_mask(sq, KNIGHT_STEPS) for sq in range(64)]
+KING_ATTACKS = [_step_mask(sq, KING_STEPS) for sq in range(64)]
+PAWN_ATTACKS = {
+    "WHITE": [_step_mask(sq, [(-1,1),(1,1)]) for sq in range(64)],
+    "BLACK": [_step_mask(sq, [(-1,-1),(1,-1)]) for sq in range(64)]
+}
+
+
+def slider_attacks(sq, occupied, directions):
+    """
+    Squares attacked by a sliding piece on sq, stopping at (and
+    including) the first occupied square in each direction.
+    """
+    attacks = 0
+    for d in directions:
+        ray = RAY_MASKS[d][sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= RAY_MASKS[d][first_blocker(blockers, d)]
+        attacks |= ray
+    return attacks
+
+
+def _square_rays(directions):
+    """
+    For each square, a tuple with (ray mask, whether the square
+    numbers increase along it, the ray masks for that direction from
+    every square) for each direction, so ray_attacks has everything
+    it needs without looking anything up by direction.
+    """
+    return [tuple((RAY_MASKS[d][sq], d in POSITIVE_DIRECTIONS, RAY_MASKS[d])
+                  for d in directions)
+            for sq in range(64)]
+
+
+ROOK_RAYS = _square_rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = _square_rays(BISHOP_DIRECTIONS)
+QUEEN_RAYS = _square_rays(QUEEN_DIRECTIONS)
+## every square a rook or bishop on each square could ever reach
+ROOK_LINES = [slider_attacks(sq, 0, ROOK_DIRECTIONS) for sq in range(64)]
+BISHOP_LINES = [slider_attacks(sq, 0, BISHOP_DIRECTIONS) for sq in range(64)]
+## the one and two squares ahead of a pawn on each square
+PAWN_AHEAD = {
+    "WHITE": [((1 << sq) << 8 | (1 << sq) << 16) & FULL for sq in range(64)],
+    "BLACK": [(1 << sq) >> 8 | (1 << sq) >> 16 for sq in range(64)]
+}
+## for each colour and piece type, the squares from each square whose
+## contents could change the piece's moves or threats: everything it
+## could ever reach (for a pawn, the squares ahead of it as well).
+## This is more than is really needed for a sliding piece, but can
+## be tested with one 'and', without knowing what the piece's moves
+## were before.
+REACH = {}
+for _colour in COLOURS:
+    REACH[(_colour, "Pawn")] = [PAWN_ATTACKS[_colour][sq] |
+                                PAWN_AHEAD[_colour][sq] for sq in range(64)]
+    REACH[(_colour, "Knight")] = KNIGHT_ATTACKS
+    REACH[(_colour, "Bishop")] = BISHOP_LINES
+    REACH[(_colour, "Rook")] = ROOK_LINES
+    REACH[(_colour, "Queen")] = [ROOK_LINES[sq] | BISHOP_LINES[sq]
+                                 for sq in range(64)]
+    REACH[(_colour, "King")] = KING_ATTACKS
+
+
+def ray_attacks(rays, occupied):
+    """
+    slider_attacks, given the rays for the square from ROOK_RAYS,
+    BISHOP_RAYS or QUEEN_RAYS (first_blocker is done inline, as
+    this is called for every sliding piece after every move).
+    """
+    attacks = 0
+    for ray, positive, masks in rays:
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                ray ^= masks[(blockers & -blockers).bit_length() - 1]
+            else:
+                ray ^= masks[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+class BitboardEngine(object):
+    """
+    Generate available moves and threatened squares for all
+    pieces on a Board using bitboards.
+    """
+    def __init__(self):
+        self.bitboards = {}
+        self.occupied = {}
+        self.all_occupied = 0
+
+    def load(self, board):
+        """
+        Use the per-colour, per-piece-type bitboards
+        that the board keeps.
+        """
+        self.bitboards = board.bitboards
+        self.occupied = board.colour_occupied
+        self.all_occupied = board.occupied
+
+
+    def attacks_from(self, piece, sq):
+        """
+        Mask of the squares threatened by a piece standing on sq.
+        """
+        piece_type = piece.piece_type
+        if piece_type == "Pawn":
+            return PAWN_ATTACKS[piece.colour][sq]
+        if piece_type == "Knight":
+            return KNIGHT_ATTACKS[sq]
+        if piece_type == "King":
+            return KING_ATTACKS[sq]
+        if piece_type == "Rook":
+            return ray_attacks(ROOK_RAYS[sq], self.all_occupied)
+        if piece_type == "Bishop":
+            return ray_attacks(BISHOP_RAYS[sq], self.all_occupied)
+        return ray_attacks(QUEEN_RAYS[sq], self.all_occupied)
+
+
+    def pawn_moves(self, piece, sq, attacks):
+        """
+        Mask of pushes and takes available to a pawn.
+        """
+        empty = ~self.all_occupied & FULL
+        enemy = self.occupied[other(piece.colour)]
+        bit = 1 << sq
+        if piece.colour == "WHITE":
+            one = (bit << 8) & empty
+            two = (one << 8) & empty & FULL
+        else:
+            one = (bit >> 8) & empty
+            two = (one >> 8) & empty
+        moves = one | (attacks & enemy)
+        if not piece.has_moved:
+            moves |= two
+        return moves
+
+
+    def is_attacked(self, sq, colour, occupied=None):
+        """
+        Is square sq attacked by any piece of the given colour?
+        A mask of occupied squares can be given to use instead
+        of the board's (e.g. to see through a piece that is moving).
+        """
+        if occupied is None:
+            occupied = self.all_occupied
+        bitboards = self.bitboards[colour]
+        if KNIGHT_ATTACKS[sq] & bitboards["Knight"] or \
+           KING_ATTACKS[sq] & bitboards["King"] or \
+           PAWN_ATTACKS[other(colour)][sq] & bitboards["Pawn"]:
+            return True
+        ## only look along the lines if there's a piece on them
+        queens = bitboards["Queen"]
+        rooks = (bitboards["Rook"] | queens) & ROOK_LINES[sq]
+        if rooks and ray_attacks(ROOK_RAYS[sq], occupied) & rooks:
+            return True
+        bishops = (bitboards["Bishop"] | queens) & BISHOP_LINES[sq]
+        return bool(bishops and
+                    ray_attacks(BISHOP_RAYS[sq], occupied) & bishops)
+
+
+    def attacked_squares(self, mask, colour):
+        """
+        The squares in mask that are attacked by the given colour.
+        """
+        attacked = 0
+        for sq in bit_squares(mask):
+            if self.is_attacked(sq, colour):
+                attacked |= 1 << sq
+        return attacked
+
+
+    def can_castle(self, king, sq, target, enemy_attacks):
+        """
+        Same rules as King.can_castle, using the bitboards.
+        """
+        row = 1 if king.colour == "WHITE" else 8
+        rook_sq = SQUARE_INDEX[("A" if target < sq else "H", row)]
+        if not self.bitboards[king.colour]["Rook"] >> rook_sq & 1:
+            return False
+        if king.board.piece_at(SQUARES[rook_sq]).has_moved:
+            return False
+        low, high = min(sq, target), max(sq, target)
+        path = ((1 << (high + 1)) - 1) ^ ((1 << low) - 1)
+        if path & enemy_attacks:
+            return False
+        ## every square between the king and the rook must be empty
+        low, high = min(sq, rook_sq), max(sq, rook_sq)
+        between = ((1 << high) - 1) ^ ((1 << (low + 1)) - 1)
+        if between & self.all_occupied:
+            return False
+        return True
+
+
+    def update_all_pieces(self, board, changed_positions=None, saved=None):
+        """
+        Set available_moves and threatens for the pieces on the board:
+        all of them, or if a list of squares whose contents have
+        changed is given, only those that could be affected.
+        If a list saved is given, each piece's (piece, available_moves,
+        threatens, eval_terms) is added to it before it is updated.
+        Returns the list of pieces that were updated.
+        """
+        self.load(board)
+        changed = 0
+        for pos in changed_positions or []:
+            changed |= 1 << SQUARE_INDEX[pos]
+        updated = []
+        kings = []
+        for p in board.pieces:
+            sq = SQUARE_INDEX[p.current_position]
+            ## kings are always updated, as their moves depend on
+            ## what the other side attacks
+            if changed and p.piece_type != "King" and \
+               not changed & (REACH[(p.colour, p.piece_type)][sq] | 1 << sq):
+                continue
+            updated.append(p)
+            if saved is not None:
+                saved.append((p, p.available_moves, p.threatens,
+                              p.eval_terms))
+            threatened = self.attacks_from(p, sq)
+            if p.piece_type == "King":
+                kings.append((p, sq, threatened))
+                continue
+            if p.piece_type == "Pawn":
+                moves = self.pawn_moves(p, sq, threatened)
+            else:
+                moves = threatened & ~self.occupied[p.colour]
+            p.threatens = mask_positions(threatened)
+            p.available_moves = mask_positions(moves)
+        ## kings can't step into threatened squares
+        for k, sq, threatened in kings:
+            enemy = other(k.colour)
+            row = 1 if k.colour == "WHITE" else 8
+            ## the squares the king could step to, and (if it might
+            ## castle) the squares from C to G it would pass through
+            candidates = threatened & ~self.occupied[k.colour]
+            if not k.has_moved:
+                candidates |= CASTLING_PATHS[k.colour]
+            enemy_attacks = self.attacked_squares(candidates, enemy)
+            moves = threatened & ~self.occupied[k.colour] & ~enemy_attacks
+            k.threatens = mask_positions(threatened)
+            k.available_moves = mask_positions(moves)
+            if not k.has_moved:
+                for col in ["C", "G"]:
+                    target = SQUARE_INDEX[(col, row)]
+                    if self.can_castle(k, sq, target, enemy_attacks):
+                        k.available_moves.append(SQUARES[target])
+        return updated
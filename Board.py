@@ -8,9 +8,43 @@ rows 1 and 2 (i.e. the bottom of the board as usually represented).
 """
 
 import copy
+import random
 import BoardPrinter
 
 COLNAMES = 'ABCDEFGH'
+COLOURS = ["WHITE", "BLACK"]
+ALL_SQUARES = frozenset((col, row) for col in COLNAMES for row in range(1,9))
+## squares are also numbered 0-63 (A1=0, B1=1, ..., H8=63), e.g. for
+## the bitmask of occupied squares.
+SQUARES = [(COLNAMES[sq % 8], sq // 8 + 1) for sq in range(64)]
+SQUARE_INDEX = {pos: sq for sq, pos in enumerate(SQUARES)}
+SQUARE_BITS = {pos: 1 << sq for sq, pos in enumerate(SQUARES)}
+PIECE_TYPES = ["Pawn", "Knight", "Bishop", "Rook", "Queen", "King"]
+
+## Random 64-bit numbers for Zobrist hashing of positions: one for each
+## piece type and colour on each square, one for black to play, and one
+## for each castling right.  A fixed seed means every process gets the
+## same keys for the same position.
+_zobrist_random = random.Random(20200101)
+ZOBRIST_PIECES = {(colour, piece_type, pos): _zobrist_random.getrandbits(64)
+                  for colour in COLOURS
+                  for piece_type in PIECE_TYPES
+                  for pos in SQUARES}
+ZOBRIST_BLACK_TO_PLAY = _zobrist_random.getrandbits(64)
+## castling rights, as (colour, king's column after castling)
+CASTLING_RIGHTS = [("WHITE","G"), ("WHITE","C"), ("BLACK","G"), ("BLACK","C")]
+ZOBRIST_CASTLING = {right: _zobrist_random.getrandbits(64)
+                    for right in CASTLING_RIGHTS}
+## squares in the middle of the board that each colour gets
+## points for threatening, when evaluating a position.
+CENTRE_SQUARES = {"WHITE": [("D",5),("E",5)],
+                  "BLACK": [("D",4),("E",4)]}
+## what each place in a piece's eval_terms (and the board's
+## eval_totals) counts: value of the pieces, number of available
+## moves, and number of each colour's centre squares threatened.
+MATERIAL = 0
+MOBILITY = 1
+CENTRE = {"WHITE": 2, "BLACK": 3}
 PIECENAMES = {
     "BLACK": {
         "King": u"\u265a",
@@ -35,6 +69,10 @@ class PieceBase(object):
     """
     base class for all pieces.
     """
+    ## the Board this piece is currently on (set by the Board
+    ## when the piece is added to its list of pieces).
+    board = None
+
     def __init__(self, colour, piece_type):
         self.colour = colour
         self.piece_type = piece_type
@@ -44,10 +82,49 @@ class PieceBase(object):
         self.current_position = None
         self.available_moves = []
         self.threatens = []
+        ## this piece's contribution to Board.eval_totals
+        self.eval_terms = (0, 0, 0, 0)
 
     def __repr__(self):
         return  PIECENAMES[self.colour][self.piece_type]
 
+    def __getstate__(self):
+        """
+        Don't drag the whole board along when copying a piece
+        (e.g. for snapshots).
+        """
+        state = self.__dict__.copy()
+        state.pop("board", None)
+        return state
+
+    @property
+    def current_position(self):
+        return self._current_position
+
+    @current_position.setter
+    def current_position(self, pos):
+        """
+        Keep the board's square index up to date whenever
+        a piece moves.
+        """
+        if self.board is not None:
+            self.board.relocate(self, self._current_position, pos)
+        self._current_position = pos
+
+    @property
+    def threatens(self):
+        return self._threatens
+
+    @threatens.setter
+    def threatens(self, positions):
+        """
+        Any change to the threatened squares invalidates
+        the board's cached threat map for this colour.
+        """
+        if self.board is not None:
+            self.board.threat_map.pop(self.colour, None)
+        self._threatens = positions
+
     def set_position(self, pos):
         self.current_position = pos
 
@@ -57,14 +134,88 @@ class PieceBase(object):
     def find_positions_threatened(self):
         return []
 
+    def find_eval_terms(self):
+        """
+        What this piece adds to the board's running totals for
+        evaluating the position (see MATERIAL, MOBILITY, CENTRE).
+        """
+        threatens = self.threatens
+        white_centre, black_centre = CENTRE_SQUARES["WHITE"], \
+            CENTRE_SQUARES["BLACK"]
+        return (self.value,
+                len(self.available_moves),
+                (white_centre[0] in threatens) + (white_centre[1] in threatens),
+                (black_centre[0] in threatens) + (black_centre[1] in threatens))
+
+    def is_affected_by(self, positions):
+        """
+        Could a change to what is on any of these squares change
+        this piece's available moves or the squares it threatens?
+        """
+        if self.current_position in positions:
+            return True
+        for pos in positions:
+            if pos in self.threatens or pos in self.available_moves:
+                return True
+        return False
+
+
+class PieceList(list):
+    """
+    A list of pieces that tells its Board whenever a piece is
+    added or removed, so the board's square index stays in sync.
+    """
+    def __init__(self, board, pieces=()):
+        super().__init__()
+        self.board = board
+        self.extend(pieces)
+
+    def append(self, piece):
+        super().append(piece)
+        self.board.place(piece)
+
+    def extend(self, pieces):
+        for p in pieces:
+            self.append(p)
+
+    def __iadd__(self, pieces):
+        self.extend(pieces)
+        return self
+
+    def insert(self, index, piece):
+        super().insert(index, piece)
+        self.board.place(piece)
+
+    def remove(self, piece):
+        super().remove(piece)
+        self.board.lift(piece)
+
 
 class Board(object):
     """
     Class representing the chess board.
     Holds a list of pieces that it can interrogate for
     position, and for what squares they are threatening.
+    Alongside the list, the board keeps an index of which piece
+    is on which square, so that lookups don't need to scan
+    every piece, and bitmasks of the occupied squares: all of them,
+    by colour, and by colour and piece type (for the bitboard engine).
+    It also keeps a Zobrist hash of the position (pieces, whose
+    turn it is, and castling rights) in zobrist_key, updated as
+    pieces are added, removed and moved, and running totals of
+    each colour's material, mobility and centre control in
+    eval_totals, updated as pieces come and go and as their moves
+    are updated (via rescore), so evaluating a position doesn't
+    need to look at every piece.
     """
     def __init__(self):
+        self.squares = {}
+        self.occupied = 0
+        self.threat_map = {}
+        self.side_to_move = "WHITE"
+        self.castling_rights = frozenset()
+        self.zobrist_key = 0
+        self.kings = {}
         self.pieces = []
         self.snapshot = {}
         pass
@@ -72,21 +223,208 @@ class Board(object):
     def __repr__(self):
         return BoardPrinter.print_board(self.pieces)
 
+    @property
+    def pieces(self):
+        return self._pieces
+
+    @pieces.setter
+    def pieces(self, pieces):
+        """
+        Replacing the list of pieces rebuilds the square index.
+        """
+        for p in getattr(self, "_pieces", []):
+            p.board = None
+        self.squares = {}
+        self.occupied = 0
+        self.colour_occupied = {colour: 0 for colour in COLOURS}
+        self.bitboards = {colour: {t: 0 for t in PIECE_TYPES}
+                          for colour in COLOURS}
+        self.threat_map = {}
+        self.castling_rights = frozenset()
+        self.zobrist_key = ZOBRIST_BLACK_TO_PLAY \
+            if self.side_to_move == "BLACK" else 0
+        self.kings = {}
+        self.eval_totals = {colour: [0, 0, 0, 0] for colour in COLOURS}
+        self._pieces = PieceList(self, pieces)
+        self.update_castling_rights()
+
+
+    def place(self, piece):
+        """
+        Register a piece that has been added to the board.
+        """
+        piece.board = self
+        if piece.current_position is not None:
+            self.squares[piece.current_position] = piece
+            bit = SQUARE_BITS.get(piece.current_position, 0)
+            self.occupied |= bit
+            self.colour_occupied[piece.colour] |= bit
+            self.bitboards[piece.colour][piece.piece_type] |= bit
+            self.zobrist_key ^= ZOBRIST_PIECES.get(
+                (piece.colour, piece.piece_type, piece.current_position), 0)
+        self.threat_map.pop(piece.colour, None)
+        piece.eval_terms = piece.find_eval_terms()
+        self.add_eval_terms(piece.colour, piece.eval_terms, 1)
+        if piece.piece_type == "King":
+            self.kings[piece.colour] = piece
+        if piece.piece_type in ("King", "Rook"):
+            self.update_castling_rights()
+
+
+    def lift(self, piece):
+        """
+        Unregister a piece that has been removed from the board.
+        """
+        if self.squares.get(piece.current_position) is piece:
+            del self.squares[piece.current_position]
+            bit = SQUARE_BITS.get(piece.current_position, 0)
+            self.occupied &= ~bit
+            self.colour_occupied[piece.colour] &= ~bit
+            self.bitboards[piece.colour][piece.piece_type] &= ~bit
+            self.zobrist_key ^= ZOBRIST_PIECES.get(
+                (piece.colour, piece.piece_type, piece.current_position), 0)
+        self.threat_map.pop(piece.colour, None)
+        self.add_eval_terms(piece.colour, piece.eval_terms, -1)
+        piece.board = None
+        if self.kings.get(piece.colour) is piece:
+            del self.kings[piece.colour]
+        if piece.piece_type in ("King", "Rook"):
+            self.update_castling_rights()
+
+
+    def relocate(self, piece, old_pos, new_pos):
+        """
+        Update the square index when a piece moves.
+        """
+        bitboards = self.bitboards[piece.colour]
+        if self.squares.get(old_pos) is piece:
+            del self.squares[old_pos]
+            bit = SQUARE_BITS.get(old_pos, 0)
+            self.occupied &= ~bit
+            self.colour_occupied[piece.colour] &= ~bit
+            bitboards[piece.piece_type] &= ~bit
+            self.zobrist_key ^= ZOBRIST_PIECES.get(
+                (piece.colour, piece.piece_type, old_pos), 0)
+        if new_pos is not None:
+            self.squares[new_pos] = piece
+            bit = SQUARE_BITS.get(new_pos, 0)
+            self.occupied |= bit
+            self.colour_occupied[piece.colour] |= bit
+            bitboards[piece.piece_type] |= bit
+            self.zobrist_key ^= ZOBRIST_PIECES.get(
+                (piece.colour, piece.piece_type, new_pos), 0)
+
+
+    def add_eval_terms(self, colour, terms, sign):
+        """
+        Add (or with sign -1, take away) a piece's contribution
+        to the running totals for its colour.
+        """
+        totals = self.eval_totals[colour]
+        totals[0] += sign * terms[0]
+        totals[1] += sign * terms[1]
+        totals[2] += sign * terms[2]
+        totals[3] += sign * terms[3]
+
+
+    def rescore(self, piece):
+        """
+        Update the running totals after a piece's available
+        moves or threatened squares have changed.
+        """
+        terms = piece.find_eval_terms()
+        ## (a piece's value never changes, so only the other terms can)
+        old_terms = piece.eval_terms
+        if terms != old_terms:
+            totals = self.eval_totals[piece.colour]
+            totals[1] += terms[1] - old_terms[1]
+            totals[2] += terms[2] - old_terms[2]
+            totals[3] += terms[3] - old_terms[3]
+            piece.eval_terms = terms
+
+
+    def save_eval_totals(self):
+        return {colour: list(totals)
+                for colour, totals in self.eval_totals.items()}
+
+
+    def set_side_to_move(self, colour):
+        """
+        Change whose turn it is, updating the hash if necessary.
+        """
+        if colour != self.side_to_move:
+            self.zobrist_key ^= ZOBRIST_BLACK_TO_PLAY
+            self.side_to_move = colour
+
+
+    def find_castling_rights(self):
+        """
+        Work out which castling rights remain, from whether the
+        kings and rooks are on their starting squares and have
+        never moved.
+        """
+        rights = []
+        for colour, king_col in CASTLING_RIGHTS:
+            row = 1 if colour == "WHITE" else 8
+            rook_col = "H" if king_col == "G" else "A"
+            unmoved = True
+            for col, piece_type in [("E", "King"), (rook_col, "Rook")]:
+                p = self.squares.get((col, row))
+                if p is None or p.colour != colour or \
+                   p.piece_type != piece_type or p.has_moved:
+                    unmoved = False
+                    break
+            if unmoved:
+                rights.append((colour, king_col))
+        return frozenset(rights)
+
+
+    def update_castling_rights(self):
+        """
+        Recalculate the castling rights, and update the hash
+        for any that have changed.
+        """
+        rights = self.find_castling_rights()
+        for right in rights.symmetric_difference(self.castling_rights):
+            self.zobrist_key ^= ZOBRIST_CASTLING[right]
+        self.castling_rights = rights
+
+
+    def pieces_key(self):
+        """
+        Hash of the pieces and castling rights only, leaving
+        out whose turn it is.
+        """
+        if self.side_to_move == "BLACK":
+            return self.zobrist_key ^ ZOBRIST_BLACK_TO_PLAY
+        return self.zobrist_key
+
+
+    def compute_zobrist_key(self):
+        """
+        Calculate the hash of the position from scratch (the
+        incrementally updated version is in self.zobrist_key).
+        """
+        key = ZOBRIST_BLACK_TO_PLAY if self.side_to_move == "BLACK" else 0
+        for pos, p in self.squares.items():
+            key ^= ZOBRIST_PIECES.get((p.colour, p.piece_type, pos), 0)
+        for right in self.find_castling_rights():
+            key ^= ZOBRIST_CASTLING[right]
+        return key
+
+
     def in_bounds(self, pos):
         """
         Check the position is inside the board boundaries.
         """
-        return pos[0] in COLNAMES and pos[1] in list(range(1,9))
+        return pos in ALL_SQUARES
 
 
     def is_empty(self, pos):
         """
         See if anything is occupying a square.
         """
-        for p in self.pieces:
-            if p.current_position == pos:
-                return False
-        return True
+        return pos not in self.squares
 
 
     def is_threatened(self, pos, colour):
@@ -94,21 +432,34 @@ class Board(object):
         See if a piece of the opposing colour is threatening that
         square.
         """
-        for p in self.pieces:
-            if p.colour == colour:
+        for attacker in COLOURS:
+            if attacker == colour:
                 continue
-            if pos in p.threatens:
+            if attacker not in self.threat_map:
+                threatened = set()
+                for p in self.pieces:
+                    if p.colour == attacker:
+                        threatened.update(p.threatens)
+                self.threat_map[attacker] = threatened
+            if pos in self.threat_map[attacker]:
                 return True
+        return False
+
+
+    def king_position(self, colour):
+        """
+        Where the king of the given colour is (None if there
+        isn't one on the board).
+        """
+        king = self.kings.get(colour)
+        return king.current_position if king else None
 
 
     def piece_at(self, pos):
         """
         return the piece at a specified position.
         """
-        for p in self.pieces:
-            if p.current_position == pos:
-                return p
-        return None
+        return self.squares.get(pos)
 
 
     def save_snapshot(self, identifier="TMP"):
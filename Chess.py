@@ -5,21 +5,63 @@ import os
 import random
 import copy
 from datetime import datetime
-from Board import Board, COLNAMES
+from Board import Board, COLNAMES, SQUARE_INDEX
 from Pieces import Pawn, Bishop, Knight, Rook, Queen, King
+from Bitboard import BitboardEngine
+from Tables import KNIGHT_MOVES, KING_MOVES, PAWN_TAKES, ROOK_DIRECTIONS, \
+    QUEEN_DIRECTIONS, sliding_attacks
+from Moves import encode_move, decode_move, move_to_str, CAPTURE, \
+    PROMOTION, CASTLE, MOVE_TUPLES, FROM_TO_MASK
 from Spinner import wait_symbol
 from Player import Player
 
 
 DEFAULT_HISTORY_DIR = "/tmp/"
+## letters used for each piece in FEN strings (upper case for WHITE)
+FEN_LETTERS = {"Pawn": "p", "Knight": "n", "Bishop": "b",
+               "Rook": "r", "Queen": "q", "King": "k"}
+FEN_PIECES = {"p": Pawn, "n": Knight, "b": Bishop,
+              "r": Rook, "q": Queen, "k": King}
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+## how many positions' legal moves to remember
+LEGAL_MOVES_CACHE_SIZE = 10000
+
+## start and finish columns for the rook when castling, keyed on
+## which column the king will end up in.
+CASTLING_COLUMNS = { "G": ["H","F"],
+                     "C": ["A","D"] }
+
+## move generation backends.  "pieces" means each piece finds its
+## own moves via the methods in Pieces.py.
+ENGINES = {"pieces": None,
+           "bitboard": BitboardEngine
+           }
 
 class Game(object):
     """
     One game of chess.
     """
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, engine="pieces", incremental=True):
+        if not engine in ENGINES.keys():
+            raise RuntimeError("Unknown move generation engine {}"\
+                               .format(engine))
+        self.engine = ENGINES[engine]() if ENGINES[engine] else None
+        ## after a move, only update the pieces that could be affected
+        self.incremental = incremental
+        self.full_update_needed = True
+        ## legal moves for positions we've already seen, keyed on
+        ## (zobrist key, colour)
+        self.legal_moves_cache = {}
+        ## the same moves in integer form (see Moves.py)
+        self.encoded_moves_cache = {}
+        ## hash of the pieces when their moves were last updated
+        self.updated_pieces_key = None
+        ## while make_move is playing a move, the state of each piece
+        ## from before update_all_pieces changed it, for unmake_move
+        self.saved_piece_state = None
         self.board = Board()
         self.history = []
+        self.undo_stack = []
         self.snapshot = None
         self.reset()
         self.players = {
@@ -30,6 +72,19 @@ class Game(object):
         self.verbose = verbose
         
 
+    @property
+    def next_to_play(self):
+        return self.board.side_to_move
+
+    @next_to_play.setter
+    def next_to_play(self, colour):
+        """
+        Whose turn it is is stored on the board, as it is part
+        of the position's hash.
+        """
+        self.board.set_side_to_move(colour)
+
+
     def init_players(self):
         for colour in self.players.keys():
             hum = input("Hello, human!  Would you like to play as {} (y/n)?"\
@@ -43,6 +98,8 @@ class Game(object):
     def add_piece(self, piece, position):
         piece.current_position = position
         self.board.pieces.append(piece)
+        ## the new piece hasn't looked for its moves yet
+        self.full_update_needed = True
 
 
     def clear(self):
@@ -71,15 +128,100 @@ class Game(object):
                 self.add_piece(Bishop(colour),(col,row))
         self.next_to_play = "WHITE"
         self.history = []
+        self.undo_stack = []
         self.update_all_pieces()
 
 
+    def load_fen(self, fen):
+        """
+        Set up a position from a string in Forsyth-Edwards Notation.
+        Kings and rooks count as having moved unless the castling
+        rights say otherwise, and pawns as having moved unless they
+        are on their starting row.  (There's no en passant, so that
+        part of the string is ignored, as are the move counters.)
+        """
+        fields = fen.split()
+        self.board.pieces = []
+        for rank_index, rank in enumerate(fields[0].split("/")):
+            row = 8 - rank_index
+            colnum = 0
+            for char in rank:
+                if char.isdigit():
+                    colnum += int(char)
+                    continue
+                colour = "WHITE" if char.isupper() else "BLACK"
+                piece = FEN_PIECES[char.lower()](colour)
+                piece.has_moved = True
+                if piece.piece_type == "Pawn":
+                    piece.has_moved = row != (2 if colour == "WHITE" else 7)
+                self.add_piece(piece, (COLNAMES[colnum], row))
+                colnum += 1
+        castling = fields[2] if len(fields) > 2 else "-"
+        for char in castling.replace("-", ""):
+            colour = "WHITE" if char.isupper() else "BLACK"
+            row = 1 if colour == "WHITE" else 8
+            rook_col = "H" if char.lower() == "k" else "A"
+            for pos in [("E", row), (rook_col, row)]:
+                if not self.board.is_empty(pos):
+                    self.board.piece_at(pos).has_moved = False
+        self.board.update_castling_rights()
+        self.next_to_play = "BLACK" if len(fields) > 1 and fields[1] == "b" \
+                            else "WHITE"
+        self.history = []
+        self.undo_stack = []
+        self.update_all_pieces()
+
+
+    def get_fen(self):
+        """
+        The current position in Forsyth-Edwards Notation.
+        """
+        ranks = []
+        for row in range(8, 0, -1):
+            rank = ""
+            empty = 0
+            for col in COLNAMES:
+                p = self.board.piece_at((col, row))
+                if p is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[p.piece_type]
+                rank += letter.upper() if p.colour == "WHITE" else letter
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        castling = ""
+        for colour, king_col, letter in [("WHITE", "G", "K"),
+                                         ("WHITE", "C", "Q"),
+                                         ("BLACK", "G", "k"),
+                                         ("BLACK", "C", "q")]:
+            if (colour, king_col) in self.board.castling_rights:
+                castling += letter
+        return "{} {} {} - 0 {}".format("/".join(ranks),
+                                        "w" if self.next_to_play == "WHITE"
+                                        else "b",
+                                        castling or "-",
+                                        len(self.history) // 2 + 1)
+
+
     def get_history(self):
-        return self.history
+        """
+        The moves played so far, as (start_pos, end_pos) tuples
+        (moves made with make_encoded_move are held as integers
+        in self.history).
+        """
+        return [decode_move(move) if isinstance(move, int) else move
+                for move in self.history]
 
     def get_history_str(self):
         history_str = ""
         for move in self.history:
+            if isinstance(move, int):
+                history_str += move_to_str(move)
+                continue
             history_str += "{}{}{}{}".format(move[0][0],
                                              move[0][1],
                                              move[1][0],
@@ -113,23 +255,55 @@ class Game(object):
         Write out the sequence of moves to a file.
         """
         with open(filename, "w") as outfile:
-            for m in self.history:
+            for m in self.get_history():
                 outfile.write("{}\n".format(m))
 
     def is_check(self, colour):
         """
         See if the king of selected colour is in check
         """
-        king_pos = None
-        threatened_positions = []
-        for p in self.board.pieces:
-            if p.colour == colour and p.piece_type == "King":
-                king_pos = p.current_position
-                break
+        king_pos = self.board.king_position(colour)
         if not king_pos:
             raise Exception("No {} king found!".format(colour))
-        if self.board.is_threatened(king_pos, colour):
-            return True
+        attacker = "BLACK" if colour == "WHITE" else "WHITE"
+        return self.is_square_attacked(king_pos, attacker)
+
+
+    def is_square_attacked(self, pos, colour, occupied=None):
+        """
+        See if any piece of the given colour attacks a square, by
+        looking outwards from that square for knights, pawns and a
+        king on the squares they would attack it from, and for
+        sliding pieces along each line.  Doesn't rely on the pieces'
+        lists of threatened squares being up to date.
+        A bitmask of occupied squares can be given to use instead of
+        the board's (e.g. to see through a piece that is moving).
+        """
+        if self.engine:
+            self.engine.load(self.board)
+            return self.engine.is_attacked(SQUARE_INDEX[pos], colour,
+                                           occupied)
+        squares = self.board.squares
+        if occupied is None:
+            occupied = self.board.occupied
+        defender = "BLACK" if colour == "WHITE" else "WHITE"
+        for piece_type, positions in [("Knight", KNIGHT_MOVES[pos]),
+                                      ("Pawn", PAWN_TAKES[defender][pos]),
+                                      ("King", KING_MOVES[pos])]:
+            for p_pos in positions:
+                p = squares.get(p_pos)
+                if p and p.colour == colour and p.piece_type == piece_type:
+                    return True
+        for direction in QUEEN_DIRECTIONS:
+            blocker = sliding_attacks(pos, direction, occupied)[1]
+            if blocker is None:
+                continue
+            p = squares[blocker]
+            if p.colour != colour:
+                continue
+            if p.piece_type == "Queen" or p.piece_type == \
+               ("Rook" if direction in ROOK_DIRECTIONS else "Bishop"):
+                return True
         return False
 
     def is_checkmate(self, colour):
@@ -143,28 +317,11 @@ class Game(object):
             return False
         ## next player to play is in check.
         ## can they get out?
-        self.update_all_pieces()
-        possible_moves = []
-        for p in self.board.pieces:
-            if p.colour == colour:
-                for move in p.available_moves:
-                    possible_moves.append((p.current_position, move))
-                    pass
-                pass
-            pass
-        self.board.save_snapshot()
-        for m in possible_moves:
-            self.move(m[0], m[1], trial_move=True)
-            if not self.is_check(colour):
-                if self.verbose:
-                    print("Can escape check with move {} to {}"\
-                          .format(m[0], m[1]))
-                self.board.load_snapshot()
-                return False
-            self.board.load_snapshot()
-        ## we have been through all possible moves, and
-        ## the king would be in check after all of them
-        return True
+        possible_moves = self.get_all_possible_moves(colour)
+        if self.verbose and len(possible_moves) > 0:
+            print("Can escape check with move {} to {}"\
+                  .format(possible_moves[0][0], possible_moves[0][1]))
+        return len(possible_moves) == 0
 
 
     def is_stalemate(self, colour):
@@ -178,27 +335,7 @@ class Game(object):
             return False
         ## next player to play is NOT in check.
         ## do they have any legal moves?
-        self.update_all_pieces()
-        possible_moves = []
-        for p in self.board.pieces:
-            if p.colour == colour:
-                for move in p.available_moves:
-                    possible_moves.append((p.current_position, move))
-                    pass
-                pass
-            pass
-        if len(possible_moves) == 0:
-            return True
-        self.board.save_snapshot()
-        for m in possible_moves:
-            self.move(m[0], m[1], trial_move=True)
-            if not self.is_check(colour):
-                self.board.load_snapshot()
-                return False
-            self.board.load_snapshot()
-        ## we have been through all possible moves, and
-        ## the king would be in check after all of them
-        return True
+        return len(self.get_all_possible_moves(colour)) == 0
 
 
     def is_legal_move(self, colour, start_pos, end_pos):
@@ -216,16 +353,11 @@ class Game(object):
         if not end_pos in p.available_moves:
             print("Piece at {} cannot move to {}".format(start_pos,end_pos))
             return False
-        self.board.save_snapshot()
-        ## try the move and see if we would be in check afterwards
-        self.move(start_pos, end_pos, trial_move=True)
-        if self.is_check(colour):
+        ## see if we would be in check afterwards
+        if not (start_pos, end_pos) in self.get_all_possible_moves(colour):
             if self.verbose:
                 print("Cannot move there - king would be in check")
-            self.board.load_snapshot()
             return False
-        self.board.load_snapshot()
-        self.update_all_pieces()
         return True
 
 
@@ -256,13 +388,8 @@ class Game(object):
             return False
         k = self.board.piece_at(start_pos)
         k.current_position = end_pos
-        ## define a dict so we can get start+finish columns
-        ## for the rook, keyed on which column the king will
-        ## end up in.
-        castling_columns = { "G": ["H","F"],
-                             "C": ["A","D"] }
-        rook_start = (castling_columns[end_pos[0]][0],end_pos[1])
-        rook_end = (castling_columns[end_pos[0]][1],end_pos[1])
+        rook_start = (CASTLING_COLUMNS[end_pos[0]][0],end_pos[1])
+        rook_end = (CASTLING_COLUMNS[end_pos[0]][1],end_pos[1])
         ## now move the rook.
         if self.board.is_empty(rook_start):
             return False
@@ -295,21 +422,35 @@ class Game(object):
             return False
         pawn = self.board.piece_at(start_pos)
         colour = pawn.colour
+        if not self.board.is_empty(end_pos):
+            self.board.pieces.remove(self.board.piece_at(end_pos))
         self.board.pieces.remove(pawn)
         self.add_piece(Queen(colour), end_pos)
         return True
 
 
-    def move(self, start_pos, end_pos, trial_move=False):
+    def move(self, start_pos, end_pos, trial_move=False, encoded=None):
         """
         move a piece on the board, taking the piece
-        at the end position if applicable
+        at the end position if applicable.
+        If the move is also given in integer form (see Moves.py),
+        its flags say whether it castles or promotes, and it is
+        what gets recorded in the history.
         """
-        if self.is_castling_move(start_pos, end_pos):
+        changed_positions = [start_pos, end_pos]
+        if encoded is None:
+            castling = self.is_castling_move(start_pos, end_pos)
+            promoting = self.is_promotion_move(start_pos, end_pos)
+        else:
+            castling = encoded & CASTLE
+            promoting = encoded & PROMOTION
+        if castling:
+            for col in CASTLING_COLUMNS[end_pos[0]]:
+                changed_positions.append((col, end_pos[1]))
             castled_ok = self.castle(start_pos, end_pos)
             if not castled_ok:
                 return False
-        elif self.is_promotion_move(start_pos, end_pos):
+        elif promoting:
             promoted_ok = self.promote(start_pos, end_pos)
             if not promoted_ok:
                 return False
@@ -319,38 +460,427 @@ class Game(object):
             p = self.board.piece_at(start_pos)
             p.current_position = end_pos
             p.has_moved = True
-        self.update_all_pieces()
+        self.board.update_castling_rights()
+        if self.incremental:
+            self.update_all_pieces(changed_positions)
+        else:
+            self.update_all_pieces()
         if not trial_move:
             self.next_player_turn()
-            self.history.append((start_pos, end_pos))
+            self.history.append((start_pos, end_pos) if encoded is None
+                                else encoded)
         return True
 
 
-    def get_all_possible_moves(self, colour):
+    def make_move(self, start_pos, end_pos, encoded=None):
+        """
+        Play a move, and push a record onto the undo stack so
+        that it can be taken back with unmake_move.
+        The record holds the pieces involved and their previous
+        state, and the moves/threats of just the pieces whose moves
+        were worked out again (all of them only after a promotion,
+        or when a full update was needed), which is much cheaper
+        than copying the whole board.
+        The move can also be given in integer form, as for self.move.
+        """
+        pieces = self.board.pieces
+        piece = self.board.piece_at(start_pos)
+        if not piece:
+            return False
+        captured = self.board.piece_at(end_pos)
+        undo = {
+            "start": start_pos,
+            "piece": piece,
+            "has_moved": piece.has_moved,
+            "captured": captured,
+            "captured_index": pieces.index(captured) if captured else None,
+            "rook": None,
+            "promoted": None,
+            "next_to_play": self.next_to_play,
+            "history_length": len(self.history),
+            "piece_state": [],
+            "eval_totals": self.board.save_eval_totals(),
+            "updated_pieces_key": self.updated_pieces_key
+        }
+        if encoded is None:
+            castling = self.is_castling_move(start_pos, end_pos)
+            promoting = self.is_promotion_move(start_pos, end_pos)
+        else:
+            castling = encoded & CASTLE
+            promoting = encoded & PROMOTION
+        if castling:
+            rook_col = CASTLING_COLUMNS[end_pos[0]][0]
+            rook = self.board.piece_at((rook_col, end_pos[1]))
+            if rook:
+                undo["rook"] = (rook, rook.current_position, rook.has_moved)
+        elif promoting:
+            ## where the pawn will be in the list once any taken
+            ## piece has been removed
+            pawn_index = pieces.index(piece)
+            if captured and undo["captured_index"] < pawn_index:
+                pawn_index -= 1
+            undo["pawn_index"] = pawn_index
+        self.saved_piece_state = undo["piece_state"]
+        try:
+            moved_ok = self.move(start_pos, end_pos, encoded=encoded)
+        finally:
+            self.saved_piece_state = None
+        if "pawn_index" in undo:
+            undo["promoted"] = pieces[-1]
+        self.undo_stack.append(undo)
+        return moved_ok
+
+
+    def make_encoded_move(self, move):
+        """
+        make_move for a move in integer form (see Moves.py).  The
+        squares are looked up rather than worked out, the flags save
+        looking at the pieces to see if it castles or promotes, and
+        the integer is what goes in the history.
+        """
+        start_pos, end_pos = MOVE_TUPLES[move & FROM_TO_MASK]
+        return self.make_move(start_pos, end_pos, encoded=move)
+
+
+    def encode_move(self, start_pos, end_pos):
+        """
+        Integer form of a move in this position (see Moves.py), with
+        flags for whether it takes a piece, promotes a pawn or castles.
+        """
+        p = self.board.piece_at(start_pos)
+        flags = CAPTURE if end_pos in self.board.squares else 0
+        if p.piece_type == "Pawn" and end_pos[1] in (1, 8):
+            flags |= PROMOTION
+        elif p.piece_type == "King" and \
+             abs(ord(start_pos[0]) - ord(end_pos[0])) > 1:
+            flags |= CASTLE
+        return encode_move(start_pos, end_pos, flags)
+
+
+    def encode_piece_moves(self, piece, end_positions):
+        """
+        Integer forms of the moves of one piece to each of
+        end_positions, as encode_move would give them.
+        """
+        start_pos = piece.current_position
+        if piece.piece_type == "King":
+            return [self.encode_move(start_pos, end_pos)
+                    for end_pos in end_positions]
+        squares = self.board.squares
+        start = SQUARE_INDEX[start_pos] << 6
+        if piece.piece_type == "Pawn":
+            return [start | SQUARE_INDEX[end_pos] |
+                    (CAPTURE if end_pos in squares else 0) |
+                    (PROMOTION if end_pos[1] in (1, 8) else 0)
+                    for end_pos in end_positions]
+        return [start | SQUARE_INDEX[end_pos] |
+                (CAPTURE if end_pos in squares else 0)
+                for end_pos in end_positions]
+
+
+    def make_null_move(self):
+        """
+        Pass, letting the other side move again (not a legal move,
+        but used by the search for null-move pruning).  Nothing on
+        the board changes, so it is taken back by unmake_move just
+        by switching back whose turn it is.
+        """
+        self.undo_stack.append({"null": True,
+                                "next_to_play": self.next_to_play})
+        self.next_player_turn()
+
+
+    def unmake_move(self):
+        """
+        Take back the last move played with make_move (or
+        make_null_move).
+        """
+        undo = self.undo_stack.pop()
+        if undo.get("null"):
+            self.next_to_play = undo["next_to_play"]
+            return
+        pieces = self.board.pieces
+        piece = undo["piece"]
+        if undo["promoted"]:
+            pieces.remove(undo["promoted"])
+            pieces.insert(undo["pawn_index"], piece)
+        else:
+            piece.current_position = undo["start"]
+        piece.has_moved = undo["has_moved"]
+        if undo["rook"]:
+            rook, rook_start, rook_has_moved = undo["rook"]
+            rook.current_position = rook_start
+            rook.has_moved = rook_has_moved
+        if undo["captured"]:
+            pieces.insert(undo["captured_index"], undo["captured"])
+        self.board.update_castling_rights()
+        for p, available_moves, threatens, eval_terms in \
+            reversed(undo["piece_state"]):
+            p.available_moves = available_moves
+            p.threatens = threatens
+            p.eval_terms = eval_terms
+        self.board.eval_totals = undo["eval_totals"]
+        self.updated_pieces_key = undo["updated_pieces_key"]
+        self.next_to_play = undo["next_to_play"]
+        del self.history[undo["history_length"]:]
+
+
+    def get_all_possible_moves(self, colour, encoded=False):
         """
         Loop through all pieces of specified colour and return 
-        list of all legal moves.
+        list of all legal moves (as integers, see Moves.py, if
+        encoded is True).
+        These are worked out once per position, and remembered in
+        case we are asked again (e.g. testing for checkmate and
+        stalemate, then choosing a move).
         """
-        self.update_all_pieces()
-        potential_moves = []
+        key = (self.board.zobrist_key, colour)
+        cache = self.encoded_moves_cache if encoded \
+            else self.legal_moves_cache
+        if key in cache:
+            return list(cache[key])
+        self.update_pieces_if_needed()
+        moves = self.get_legal_moves(colour, encoded)
+        if len(cache) >= LEGAL_MOVES_CACHE_SIZE:
+            cache.clear()
+        cache[key] = tuple(moves)
+        return moves
+
+
+    def update_pieces_if_needed(self):
+        """
+        When updating incrementally, the pieces are already up
+        to date, unless new pieces have been added or pieces have
+        been moved other than by self.move.
+        """
+        if self.full_update_needed or not self.incremental or \
+           self.board.pieces_key() != self.updated_pieces_key:
+            self.update_all_pieces()
+
+
+    def get_capture_moves(self, colour, encoded=False, checks_and_pins=None):
+        """
+        Legal moves that take a piece or promote a pawn, for
+        playing out exchanges at the end of a search.  In check,
+        every legal move is returned, as any of them might be
+        the only way out.  With encoded, the moves are integers
+        (see Moves.py).  The output of find_checks_and_pins can be
+        given, if the caller has already worked it out.
+        """
+        self.update_pieces_if_needed()
+        if checks_and_pins is None:
+            checks_and_pins = self.find_checks_and_pins(colour)
+        checks, pins = checks_and_pins
+        if checks:
+            return self.get_all_possible_moves(colour, encoded)
+        last_row = 8 if colour == "WHITE" else 1
+        squares = self.board.squares
         moves = []
         for p in self.board.pieces:
             if p.colour != colour:
                 continue
-            start_pos = p.current_position
-            for end_pos in p.available_moves:
-                potential_moves.append((start_pos, end_pos))
-        ## now loop through potential moves to see which are legal
-        for move in potential_moves:
-            if self.is_legal_move(colour, move[0],move[1]):
-                moves.append(move)
+            promoting = p.piece_type == "Pawn"
+            end_positions = [end_pos for end_pos in p.available_moves
+                             if (end_pos in squares or
+                                 (promoting and end_pos[1] == last_row)) and
+                             self.passes_check_and_pin_filter(p, end_pos,
+                                                              checks, pins)]
+            self.add_piece_moves(moves, p, end_positions, encoded)
         return moves
-        
 
-    def update_all_pieces(self):
+
+    def find_checks_and_pins(self, colour):
+        """
+        Look outwards from the king of the given colour, along the
+        lines a knight, pawn or sliding piece could attack it from,
+        to find:
+        * checks: a list with one set of squares per piece giving check,
+          holding the squares that would deal with that check (taking
+          the checking piece, or getting in the way).
+        * pins: a dict from each piece pinned to the king to the set of
+          squares it can move to without exposing the king.
+        """
+        board = self.board
+        king_pos = board.king_position(colour)
+        checks, pins = [], {}
+        if king_pos is None:
+            return checks, pins
+        for pos in KNIGHT_MOVES[king_pos]:
+            p = board.squares.get(pos)
+            if p and p.colour != colour and p.piece_type == "Knight":
+                checks.append(set([pos]))
+        for pos in PAWN_TAKES[colour][king_pos]:
+            p = board.squares.get(pos)
+            if p and p.colour != colour and p.piece_type == "Pawn":
+                checks.append(set([pos]))
+        for direction in QUEEN_DIRECTIONS:
+            sliders = ("Rook", "Queen") if direction in ROOK_DIRECTIONS \
+                      else ("Bishop", "Queen")
+            ray, blocker = sliding_attacks(king_pos, direction, board.occupied)
+            if blocker is None:
+                continue
+            p = board.squares[blocker]
+            if p.colour != colour:
+                if p.piece_type in sliders:
+                    checks.append(set(ray))
+                continue
+            ## one of our pieces - is there an enemy slider behind it?
+            without_blocker = board.occupied & ~(1 << SQUARE_INDEX[blocker])
+            ray, pinner = sliding_attacks(king_pos, direction, without_blocker)
+            if pinner is None:
+                continue
+            q = board.squares[pinner]
+            if q.colour != colour and q.piece_type in sliders:
+                pins[p] = set(ray)
+        return checks, pins
+
+
+    def passes_check_and_pin_filter(self, piece, end_pos, checks, pins):
+        """
+        Given the output of find_checks_and_pins, would moving
+        this piece to end_pos leave its own king in check?
+        """
+        if piece.piece_type == "King":
+            return self.is_safe_king_move(piece, end_pos, checks)
+        if len(checks) > 1:
+            ## double check - only the king can move
+            return False
+        if checks and end_pos not in checks[0]:
+            return False
+        if piece in pins and end_pos not in pins[piece]:
+            return False
+        return True
+
+
+    def is_safe_king_move(self, king, end_pos, checks):
+        """
+        A king can move to a square that isn't attacked once the
+        king has left its current square (so it can't step back
+        along the line of a piece checking it), and can only castle
+        when not in check, with nothing between the king and the rook,
+        and not passing through an attacked square.
+        """
+        attacker = "BLACK" if king.colour == "WHITE" else "WHITE"
+        start_pos = king.current_position
+        occupied = self.board.occupied & ~(1 << SQUARE_INDEX[start_pos])
+        if not self.is_castling_move(start_pos, end_pos):
+            return not self.is_square_attacked(end_pos, attacker, occupied)
+        if checks:
+            return False
+        start_colnum = COLNAMES.index(start_pos[0])
+        end_colnum = COLNAMES.index(end_pos[0])
+        direction = 1 if end_colnum > start_colnum else -1
+        ## nothing between the king and the rook (the rook is on
+        ## the A or H file)
+        rook_colnum = 0 if direction < 0 else 7
+        for colnum in range(start_colnum + direction, rook_colnum,
+                            direction):
+            if (COLNAMES[colnum], end_pos[1]) in self.board.squares:
+                return False
+        for colnum in range(start_colnum + direction, end_colnum + direction,
+                            direction):
+            if self.is_square_attacked((COLNAMES[colnum], end_pos[1]),
+                                       attacker):
+                return False
+        return True
+
+
+    def add_piece_moves(self, moves, piece, end_positions, encoded=False):
+        """
+        Add the moves of one piece to each of end_positions onto
+        the list moves, as (start_pos, end_pos) tuples or (with
+        encoded) as integers.
+        """
+        if encoded:
+            moves += self.encode_piece_moves(piece, end_positions)
+        else:
+            start_pos = piece.current_position
+            moves += [(start_pos, end_pos) for end_pos in end_positions]
+
+
+    def get_legal_moves(self, colour, encoded=False):
+        """
+        List of all legal moves for the given colour, found by
+        filtering each piece's available moves by the checks and
+        pins on its king, rather than by trying each move out.
+        With encoded, the moves are integers (see Moves.py), made
+        straight from the pieces' lists without building tuples.
+        Assumes all pieces are up to date.
+        """
+        checks, pins = self.find_checks_and_pins(colour)
+        if checks:
+            return self.get_check_evasions(colour, checks, pins, encoded)
+        moves = []
+        for p in self.board.pieces:
+            if p.colour != colour:
+                continue
+            if p.piece_type == "King" or p in pins:
+                end_positions = [end_pos for end_pos in p.available_moves
+                                 if self.passes_check_and_pin_filter(
+                                         p, end_pos, checks, pins)]
+            else:
+                end_positions = p.available_moves
+            self.add_piece_moves(moves, p, end_positions, encoded)
+        return moves
+
+
+    def get_check_evasions(self, colour, checks, pins, encoded=False):
+        """
+        Legal moves when in check: king moves to safe squares, plus
+        (if there is only one checking piece) taking it or getting
+        in the way with an unpinned piece.
+        """
+        moves = []
+        for p in self.board.pieces:
+            if p.colour != colour:
+                continue
+            if p.piece_type != "King" and len(checks) > 1:
+                continue
+            end_positions = [end_pos for end_pos in p.available_moves
+                             if self.passes_check_and_pin_filter(
+                                     p, end_pos, checks, pins)]
+            self.add_piece_moves(moves, p, end_positions, encoded)
+        return moves
+
+    def update_all_pieces(self, changed_positions=None):
+        """
+        Find the available moves and threatened squares for the
+        pieces on the board.  If a list of squares whose contents
+        have changed is given, only the pieces that could be affected
+        by those squares are updated.
+        Kings go last, as they can't move into threatened squares.
+        During make_move, each piece's state is saved before it is
+        updated, so that unmake_move can put it back.
+        """
+        self.updated_pieces_key = self.board.pieces_key()
+        if self.full_update_needed:
+            changed_positions = None
+            self.full_update_needed = False
+        saved = self.saved_piece_state
+        if self.engine:
+            for p in self.engine.update_all_pieces(self.board,
+                                                   changed_positions, saved):
+                self.board.rescore(p)
+            return
+        kings = []
         for p in self.board.pieces:
+            if changed_positions and not p.is_affected_by(changed_positions):
+                continue
+            if saved is not None:
+                saved.append((p, p.available_moves, p.threatens,
+                              p.eval_terms))
+            if p.piece_type == "King":
+                kings.append(p)
+                continue
             p.find_available_moves(self.board)
-            p.find_positions_threatened(self.board)
+            self.board.rescore(p)
+        ## a king's threatened squares don't depend on anything else,
+        ## so find those first, as each king needs the other's.
+        for k in kings:
+            k.find_positions_threatened(self.board)
+        for k in kings:
+            k.find_available_moves(self.board)
+            self.board.rescore(k)
 
 
     def next_player_turn(self):
@@ -0,0 +1,165 @@
+"""
+Evaluation of positions using NumPy.
+
+A position is encoded as a 12x64 one-hot array (one plane per colour and
+piece type, one column per square, A1=0 ... H8=63), flattened to a vector
+of length 768.  The score is then the dot product of that vector with a
+vector of weights holding each piece's value plus a bonus from a
+piece-square table, so a whole batch of positions can be scored with a
+single matrix-vector product.
+
+NumPy is optional: without it, NumpyEvaluator can't be created, but
+everything else works as before.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from Board import COLOURS, PIECE_TYPES, SQUARE_INDEX
+from Pieces import Pawn, Knight, Bishop, Rook, Queen, King
+
+PIECE_VALUES = {p.piece_type: p.value
+                for p in [piece_class("WHITE") for piece_class in
+                          [Pawn, Knight, Bishop, Rook, Queen, King]]}
+
+## bonus (in hundredths of a pawn) for a WHITE piece on each square,
+## laid out as the board is usually printed: row 8 first, A to H.
+## BLACK uses the same tables flipped top to bottom.
+PIECE_SQUARE_TABLES = {
+    "Pawn": [  0,  0,  0,  0,  0,  0,  0,  0,
+              50, 50, 50, 50, 50, 50, 50, 50,
+              10, 10, 20, 30, 30, 20, 10, 10,
+               5,  5, 10, 25, 25, 10,  5,  5,
+               0,  0,  0, 20, 20,  0,  0,  0,
+               5, -5,-10,  0,  0,-10, -5,  5,
+               5, 10, 10,-20,-20, 10, 10,  5,
+               0,  0,  0,  0,  0,  0,  0,  0],
+    "Knight": [-50,-40,-30,-30,-30,-30,-40,-50,
+               -40,-20,  0,  0,  0,  0,-20,-40,
+               -30,  0, 10, 15, 15, 10,  0,-30,
+               -30,  5, 15, 20, 20, 15,  5,-30,
+               -30,  0, 15, 20, 20, 15,  0,-30,
+               -30,  5, 10, 15, 15, 10,  5,-30,
+               -40,-20,  0,  5,  5,  0,-20,-40,
+               -50,-40,-30,-30,-30,-30,-40,-50],
+    "Bishop": [-20,-10,-10,-10,-10,-10,-10,-20,
+               -10,  0,  0,  0,  0,  0,  0,-10,
+               -10,  0,  5, 10, 10,  5,  0,-10,
+               -10,  5,  5, 10, 10,  5,  5,-10,
+               -10,  0, 10, 10, 10, 10,  0,-10,
+               -10, 10, 10, 10, 10, 10, 10,-10,
+               -10,  5,  0,  0,  0,  0,  5,-10,
+               -20,-10,-10,-10,-10,-10,-10,-20],
+    "Rook": [ 0,  0,  0,  0,  0,  0,  0,  0,
+              5, 10, 10, 10, 10, 10, 10,  5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+              0,  0,  0,  5,  5,  0,  0,  0],
+    "Queen": [-20,-10,-10, -5, -5,-10,-10,-20,
+              -10,  0,  0,  0,  0,  0,  0,-10,
+              -10,  0,  5,  5,  5,  5,  0,-10,
+               -5,  0,  5,  5,  5,  5,  0, -5,
+                0,  0,  5,  5,  5,  5,  0, -5,
+              -10,  5,  5,  5,  5,  5,  0,-10,
+              -10,  0,  5,  0,  0,  0,  0,-10,
+              -20,-10,-10, -5, -5,-10,-10,-20],
+    "King": [-30,-40,-40,-50,-50,-40,-40,-30,
+             -30,-40,-40,-50,-50,-40,-40,-30,
+             -30,-40,-40,-50,-50,-40,-40,-30,
+             -30,-40,-40,-50,-50,-40,-40,-30,
+             -20,-30,-30,-40,-40,-30,-30,-20,
+             -10,-20,-20,-20,-20,-20,-20,-10,
+              20, 20,  0,  0,  0,  0, 20, 20,
+              20, 30, 10,  0,  0, 10, 30, 20]
+}
+
+## which of the 12 planes each colour and piece type goes in
+PLANES = {(colour, piece_type): 6 * i + j
+          for i, colour in enumerate(COLOURS)
+          for j, piece_type in enumerate(PIECE_TYPES)}
+ENCODING_SIZE = 12 * 64
+
+
+def table_index(colour, sq):
+    """
+    Index into a piece-square table for a piece of the
+    given colour on square number sq.
+    """
+    row, colnum = sq // 8, sq % 8
+    if colour == "WHITE":
+        return (7 - row) * 8 + colnum
+    return row * 8 + colnum
+
+
+def weight_list():
+    """
+    Points for each colour and piece type on each square, from
+    WHITE's point of view, in the order of the encoding.
+    """
+    weights = [0.] * ENCODING_SIZE
+    for (colour, piece_type), plane in PLANES.items():
+        sign = 1 if colour == "WHITE" else -1
+        table = PIECE_SQUARE_TABLES[piece_type]
+        for sq in range(64):
+            weights[plane * 64 + sq] = sign * (PIECE_VALUES[piece_type] +
+                                               table[table_index(colour, sq)]
+                                               / 100.)
+    return weights
+
+
+def encoding_indices(board):
+    """
+    Positions of the ones in the encoding of the board.
+    """
+    return [PLANES[(p.colour, p.piece_type)] * 64 + SQUARE_INDEX[pos]
+            for pos, p in board.squares.items()]
+
+
+class NumpyEvaluator(object):
+    """
+    Score positions (from WHITE's point of view) by material and
+    piece-square tables, one at a time or in batches.
+    """
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("NumpyEvaluator needs numpy to be installed")
+        self.weights = np.array(weight_list())
+
+
+    def encode(self, board):
+        """
+        One-hot vector of length 768 for the pieces on the board.
+        """
+        encoded = np.zeros(ENCODING_SIZE)
+        encoded[encoding_indices(board)] = 1.
+        return encoded
+
+
+    def encode_batch(self, indices):
+        """
+        Array with one encoded position per row, given the
+        encoding_indices of each position (so positions can be
+        collected while moves are being made and taken back on
+        the same board).
+        """
+        encoded = np.zeros((len(indices), ENCODING_SIZE))
+        for row, ones in enumerate(indices):
+            encoded[row, ones] = 1.
+        return encoded
+
+
+    def score(self, board):
+        return float(self.encode(board) @ self.weights)
+
+
+    def score_batch(self, encoded):
+        """
+        Scores for a batch of positions, given as an array with
+        one encoded position per row (or a list of encodings).
+        """
+        return np.asarray(encoded) @ self.weights
@@ -1,10 +1,152 @@
 """
 Different methods for the AI to choose the next move.
 """
+import io
+import os
 import random
 import operator
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from Board import SQUARE_INDEX, MATERIAL, MOBILITY, CENTRE
+from Tables import KNIGHT_MOVES, PAWN_TAKES, \
+    ROOK_DIRECTIONS, BISHOP_DIRECTIONS, QUEEN_DIRECTIONS, sliding_attacks
+from TranspositionTable import TranspositionTable, \
+    SharedTranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from Evaluator import NumpyEvaluator, encoding_indices
+from Moves import CAPTURE, PROMOTION, MOVE_TUPLES, FROM_TO_MASK, decode_move
 
 COLOURS = ["WHITE","BLACK"]
+## score for being checkmated (more than any total of piece values)
+MATE_SCORE = 1000.
+## in the quiescence search, don't bother with captures that would
+## still leave us this many points short of alpha.
+DELTA_MARGIN = 2.
+## move ordering scores for quiet moves: the two killer moves for the
+## ply, then the rest by their history score, squashed to less than
+## HISTORY_MAX (so all of these stay below captures and checks).
+KILLER_SCORES = (400, 390)
+HISTORY_MAX = 300
+HISTORY_SCALE = 1000.
+## width of the window for searches that only need to know whether
+## a score is above or below some value.
+NULL_WINDOW = 1e-6
+## how much shallower the search after a null move is.
+NULL_MOVE_REDUCTION = 2
+## late move reductions: after this many moves at a node at least
+## LMR_MIN_DEPTH from the end, quiet moves are searched one ply less.
+LMR_FULL_DEPTH_MOVES = 3
+LMR_MIN_DEPTH = 3
+## half-width of the first window searched around the score from the
+## last iteration, and how much it grows each time the score is outside.
+ASPIRATION_WINDOW = 1.5
+ASPIRATION_GROWTH = 4
+## ways of scoring a position.  "pieces" means the running totals
+## the board keeps for each colour (see get_static_points).
+EVALUATORS = {"pieces": None,
+              "numpy": NumpyEvaluator
+              }
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time or node budget runs out.
+    """
+    pass
+
+
+def make_evaluator(name):
+    """
+    Create the evaluator with the given name in EVALUATORS
+    (or None for the default).
+    """
+    if not name in EVALUATORS.keys():
+        raise RuntimeError("Unknown evaluator {}".format(name))
+    return EVALUATORS[name]() if EVALUATORS[name] else None
+
+
+def position_args(game):
+    """
+    Enough to rebuild the position in another process without
+    sending the whole Game: its FEN, and which kings have castled.
+    """
+    castled = [colour for colour, king in game.board.kings.items()
+               if king.has_castled]
+    return game.get_fen(), castled
+
+
+def rebuild_game(fen, castled):
+    """
+    A new Game in the position given by position_args.
+    """
+    ## imported here, as Chess imports this module (via Player)
+    from Chess import Game
+    game = Game()
+    game.load_fen(fen)
+    for king_colour in castled:
+        game.board.kings[king_colour].has_castled = True
+    return game
+
+
+def search_root_move(args):
+    """
+    Minimax score for one root move, run in a worker process.
+    args is (fen, castled colours, move (as an integer, see Moves.py),
+    colour, depth, tt_size_mb, evaluator name, quiescence depth).
+    Returns the score and the number of nodes searched.
+    """
+    fen, castled, move, colour, depth, tt_size_mb, evaluator, \
+        quiescence_depth = args
+    with redirect_stdout(io.StringIO()):
+        game = rebuild_game(fen, castled)
+        player = MinimaxPlayer(colour, depth, tt_size_mb, evaluator,
+                               quiescence_depth=quiescence_depth)
+        game.make_encoded_move(move)
+        value = player.minimax(game, depth - 1, False, ply=1)[0]
+    return value, player.nodes
+
+
+## the shared transposition table, in each Lazy SMP worker process
+_shared_table = None
+
+def attach_shared_table(max_size_mb, name):
+    """
+    Set up a Lazy SMP worker process to use the shared table.
+    """
+    global _shared_table
+    _shared_table = SharedTranspositionTable(max_size_mb, name=name)
+
+
+def search_shared(args):
+    """
+    Alpha-beta search of the whole position to one depth, run in
+    a Lazy SMP worker process using the shared transposition table.
+    args is (fen, castled colours, depth, age of the table (the
+    iteration of the iterative deepening, so entries from earlier
+    iterations are replaced first), best move from the last iteration,
+    seconds until the deadline or None, evaluator name, quiescence
+    depth).
+    Returns (depth, score, best move, nodes searched, principal
+    variation), with score and best move None if the search ran out
+    of time.  Moves are integers, as in Moves.py.
+    """
+    fen, castled, depth, age, first_move, time_left, evaluator, \
+        quiescence_depth = args
+    with redirect_stdout(io.StringIO()):
+        game = rebuild_game(fen, castled)
+        player = AlphaBetaPlayer(game.next_to_play, depth, tt_size_mb=0,
+                                 evaluator=evaluator,
+                                 quiescence_depth=quiescence_depth)
+    player.tt = _shared_table
+    player.tt.age = age
+    if time_left is not None:
+        player.deadline = time.perf_counter() + time_left
+    try:
+        score, move = player.search_root(game, depth, first_move=first_move)
+    except SearchTimeout:
+        score, move = None, None
+    return depth, score, move, player.nodes, player.pv_table.get(0, [])
+
 
 def other_colour(my_colour):
     """
@@ -24,12 +166,7 @@ class RandomMovePlayer(object):
         print("{} will choose moves randomly.".format(colour))
 
     def choose_move(self, game):
-        all_possible_moves = []
-        for p in game.board.pieces:
-            if p.colour == self.colour:
-                for m in p.available_moves:
-                    if game.is_legal_move(self.colour, p.current_position, m):
-                        all_possible_moves.append((p.current_position,m))
+        all_possible_moves = game.get_all_possible_moves(self.colour)
         move_index = random.randint(0,len(all_possible_moves)-1)
         start, end = all_possible_moves[move_index]
         return start, end
@@ -44,13 +181,7 @@ class BestNextPointsPlayer(object):
         print("{} will choose moves according to simple points total for the next move.".format(colour))
 
     def choose_move(self, game):
-        all_possible_moves = []
-        for p in game.board.pieces:
-            start_pos = p.current_position
-            if p.colour == self.colour:
-                for m in p.available_moves:
-                    if game.is_legal_move(self.colour, start_pos, m):
-                        all_possible_moves.append((start_pos,m))
+        all_possible_moves = game.get_all_possible_moves(self.colour)
         best_points = -999
         best_moves = []
         print(game.board)
@@ -92,92 +223,790 @@ class BestNextPointsPlayer(object):
 class MinimaxPlayer(object):
     """
     Use minimax algorithm to choose moves.
+    Positions already searched are kept in a transposition table
+    of up to tt_size_mb megabytes (0 to switch it off).
+    With evaluator="numpy", positions are scored by material and
+    piece-square tables, and all the children of a node one move
+    from the end of the search are scored together in one batch.
+    If workers is more than 1 (or None, for one per CPU), the root
+    moves are shared out between that many processes, each with its
+    own copy of the position and its own transposition table.
+    At the end of the search, captures are played out for up to
+    quiescence_depth more plies (0 to switch this off), so that
+    positions aren't scored half way through an exchange.
+    After choosing a move, the line of best play the search expects
+    is in self.principal_variation.
     """
-    def __init__(self, colour, depth=2):
+    description = "minimax algorithm"
+
+    def __init__(self, colour, depth=2, tt_size_mb=16, evaluator="pieces",
+                 workers=1, quiescence_depth=4):
         self.colour = colour
         self.depth = depth
-        print("{} will use minimax algorithm to choose moves.".format(colour))
+        self.tt_size_mb = tt_size_mb
+        self.tt = TranspositionTable(tt_size_mb) if tt_size_mb else None
+        self.evaluator_name = evaluator
+        self.evaluator = make_evaluator(evaluator)
+        self.workers = workers
+        self.quiescence_depth = quiescence_depth
+        self.nodes = 0
+        self.pv_table = {}
+        self.principal_variation = []
+        print("{} will use {} to choose moves.".format(colour,
+                                                      self.description))
+
+
+    def update_pv(self, ply, move):
+        """
+        A new best move at this ply: the principal variation from
+        here is the move followed by the one from the position after
+        it.  pv_table[ply] holds the best line found from the node
+        currently being searched at each ply, and each node starts
+        with an empty line, so the table only ever needs one line
+        per ply.
+        """
+        self.pv_table[ply] = [move] + self.pv_table.get(ply + 1, [])
 
     def get_points_for_position(self, game):
         """"
-        points for pieces, and heuristics for position
+        points for pieces, and heuristics for position, or
+        +/-1000 if the side to play is checkmated.
+        The search doesn't use this, as it finds checkmates itself
+        when a position turns out to have no legal moves.
         """
-        points = 0.
         next_to_play = game.next_to_play
-        centre_squares = {
-            "WHITE": [("D",5),("E",5)],
-            "BLACK": [("D",4),("E",4)]
-        }
         if game.is_checkmate(next_to_play):
-            points = 1000. if self.colour == next_to_play else -1000.
+            points = -1000. if self.colour == next_to_play else 1000.
             return points
-        for p in game.board.pieces:
-            sign = 1 if p.colour == self.colour else -1
-            points += sign * p.value
-            points += sign * 0.005 * len(p.available_moves)
-            if p.piece_type == "King" and p.has_castled:
-                points += sign * 0.2
-            for cs in centre_squares[self.colour]:
-                if cs in p.threatens:
-                    points += sign * 0.1
+        return self.get_static_points(game)
+
+
+    def get_static_points(self, game):
+        """
+        points for pieces, and heuristics for position, without
+        looking for checkmate.
+        The totals over all the pieces are kept up to date by the
+        board as moves are made, so this doesn't need to loop over
+        the pieces.
+        """
+        if self.evaluator:
+            points = self.evaluator.score(game.board)
+            return points if self.colour == "WHITE" else -points
+        mine = game.board.eval_totals[self.colour]
+        theirs = game.board.eval_totals[other_colour(self.colour)]
+        centre = CENTRE[self.colour]
+        points = (mine[MATERIAL] - theirs[MATERIAL]) \
+            + 0.005 * (mine[MOBILITY] - theirs[MOBILITY]) \
+            + 0.1 * (mine[centre] - theirs[centre])
+        for colour, king in game.board.kings.items():
+            if king.has_castled:
+                points += 0.2 if colour == self.colour else -0.2
         return points
 
 
-    def minimax(self, game, depth, maximizingPlayer, move_str):
-        game.board.save_snapshot(move_str)
+    def evaluate(self, game):
+        """
+        Points for the position from the point of view of the
+        side to play (not looking for checkmate).
+        """
+        points = self.get_static_points(game)
+        return points if game.next_to_play == self.colour else -points
+
+
+    def leaf_value(self, game, alpha=-2*MATE_SCORE, beta=2*MATE_SCORE):
+        """
+        Points (from our point of view) for a position at the end
+        of the main search, after any captures have been played out.
+        If the points are outside (alpha, beta), only a bound on
+        them is returned.
+        """
+        if game.next_to_play == self.colour:
+            return self.quiescence(game, alpha, beta)
+        return -self.quiescence(game, -beta, -alpha)
+
+
+    def quiescence(self, game, alpha, beta, depth=0):
+        """
+        Score (for the side to play) of the position, searching only
+        captures and promotions, assuming it is between alpha and beta.
+        The side to play can always 'stand pat' and not capture
+        anything, so the static score is a lower bound, and captures
+        that couldn't raise the score to alpha even if the piece
+        taken were free are skipped ('delta pruning').
+        In check, every move is searched, and there is no standing pat.
+        This is also where checkmate is found at the end of the main
+        search: past quiescence_depth, moves are only looked at in
+        check, to see if there are any.
+        """
+        self.check_budget()
+        colour = game.next_to_play
+        checks_and_pins = game.find_checks_and_pins(colour)
+        in_check = bool(checks_and_pins[0])
+        if depth >= self.quiescence_depth and not in_check:
+            return self.evaluate(game)
+        moves = game.get_capture_moves(colour, encoded=True,
+                                       checks_and_pins=checks_and_pins)
+        if in_check and not moves:
+            return -MATE_SCORE
+        if depth >= self.quiescence_depth:
+            return self.evaluate(game)
+        if in_check:
+            best_value = -2 * MATE_SCORE
+            stand_pat = None
+        else:
+            stand_pat = self.evaluate(game)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            best_value = stand_pat
+        board = game.board
+        captures = []
+        for move in moves:
+            start_pos, end_pos = MOVE_TUPLES[move & FROM_TO_MASK]
+            gain = board.piece_at(end_pos).value if move & CAPTURE else 0
+            if move & PROMOTION:
+                gain += 8
+            if stand_pat is not None and \
+               stand_pat + gain + DELTA_MARGIN < alpha:
+                continue
+            captures.append((gain, -board.piece_at(start_pos).value, move))
+        captures.sort(key=lambda capture: capture[:2], reverse=True)
+        for gain, attacker, move in captures:
+            self.nodes += 1
+            game.make_encoded_move(move)
+            value = -self.quiescence(game, -beta, -alpha, depth + 1)
+            game.unmake_move()
+            if value > best_value:
+                best_value = value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best_value
+
+
+    def check_budget(self):
+        """
+        Minimax searches have no time or node budget.
+        """
+        pass
+
+
+    def minimax(self, game, depth, maximizingPlayer, bound=None, ply=0):
+        """
+        Return the points for the position searched to the given
+        depth, and the principal variation from it.  bound is the
+        best score found so far at the parent node: if this is a final
+        position, it only matters whether it beats that, which lets
+        the quiescence search stop early.  ply is how many moves we
+        are from the root of the search.
+        """
+        self.nodes += 1
+        self.pv_table[ply] = []
+        key = game.board.zobrist_key
+        ## use a previous result for this position, as long as it
+        ## was searched at least as deep (but not for the root
+        ## position, where we need the move as well as the score).
+        if self.tt and depth < self.depth:
+            entry = self.tt.probe(key)
+            if entry and entry[1] >= depth:
+                return entry[2], self.pv_table[ply]
         if depth == 0:
-            return self.get_points_for_position(game), move_str
+            alpha, beta = -2 * MATE_SCORE, 2 * MATE_SCORE
+            if bound is not None and maximizingPlayer:
+                beta = bound
+            elif bound is not None:
+                alpha = bound
+            value = self.leaf_value(game, alpha, beta)
+            if self.tt and alpha < value < beta:
+                self.tt.store(key, 0, value, EXACT, None)
+            return value, self.pv_table[ply]
         next_depth = depth - 1
-        best_move_str = None
-        if maximizingPlayer:
-            game.next_to_play = self.colour
-            best_value = -999.
-            for move in game.get_all_possible_moves(self.colour):
-                game.board.load_snapshot(move_str)
-                game.move(move[0],move[1])
-                new_move_str = "{}{}{}{}{}".format(move_str,
-                                                   move[0][0],
-                                                   move[0][1],
-                                                   move[1][0],
-                                                   move[1][1])
-                
-                value = self.minimax(game, next_depth, False, new_move_str)[0]
-                if value > best_value:
-                    best_value = value
-                    best_move_str = new_move_str
-            return best_value, best_move_str
-        else:
-            game.next_to_play = other_colour(self.colour)
-            best_value = 999.
-            for move in game.get_all_possible_moves(other_colour(self.colour)):
-                game.board.load_snapshot(move_str)
-                game.move(move[0], move[1])
-                new_move_str = "{}{}{}{}{}".format(move_str,
-                                                   move[0][0],
-                                                   move[0][1],
-                                                   move[1][0],
-                                                   move[1][1])
-                value = self.minimax(game, next_depth, True, new_move_str)[0]
-                if value < best_value:
-                    best_value = value
-                    best_move_str = new_move_str
-        return best_value, best_move_str
+        best_move = None
+        colour = self.colour if maximizingPlayer \
+                 else other_colour(self.colour)
+        game.next_to_play = colour
+        moves = game.get_all_possible_moves(colour, encoded=True)
+        if not moves:
+            ## checkmate or stalemate - no need to look any further
+            if not game.is_check(colour):
+                return 0., self.pv_table[ply]
+            return (-MATE_SCORE if maximizingPlayer else MATE_SCORE), \
+                self.pv_table[ply]
+        ## score all the final positions together if we can
+        child_values = None
+        if depth == 1 and self.evaluator:
+            child_values = self.evaluate_children(game, moves)
+            self.pv_table[ply + 1] = []
+        best_value = -2 * MATE_SCORE if maximizingPlayer \
+                     else 2 * MATE_SCORE
+        for i, move in enumerate(moves):
+            if child_values is not None:
+                value = child_values[i]
+            else:
+                game.make_encoded_move(move)
+                value = self.minimax(game, next_depth, not maximizingPlayer,
+                                     best_value if best_move else None,
+                                     ply + 1)[0]
+                game.unmake_move()
+            if (maximizingPlayer and value > best_value) or \
+               (not maximizingPlayer and value < best_value):
+                best_value = value
+                best_move = move
+                self.update_pv(ply, move)
+        if self.tt:
+            self.tt.store(key, depth, best_value, EXACT, best_move)
+        return best_value, self.pv_table[ply]
         
 
+    def evaluate_children(self, game, moves):
+        """
+        Points for the position after each of the moves.  Apart
+        from positions in check (which might be checkmate) and, with
+        the quiescence search, positions where there are captures
+        to play out, the positions are
+        collected and scored by the evaluator in a single batch.
+        """
+        values = [None] * len(moves)
+        batch = []
+        batch_moves = []
+        for i, move in enumerate(moves):
+            self.nodes += 1
+            game.make_encoded_move(move)
+            if game.is_check(game.next_to_play) or \
+               (self.quiescence_depth and
+                game.get_capture_moves(game.next_to_play)):
+                values[i] = self.leaf_value(game)
+            else:
+                batch.append(encoding_indices(game.board))
+                batch_moves.append(i)
+            game.unmake_move()
+        if batch:
+            sign = 1 if self.colour == "WHITE" else -1
+            scores = self.evaluator.score_batch(
+                self.evaluator.encode_batch(batch))
+            for i, score in zip(batch_moves, scores):
+                values[i] = sign * float(score)
+        return values
+
+
     def choose_move(self, game):
         """
         Return start and end position based on minimax
         """
-        game_history = game.get_history_str()
-        game.save_snapshot()
-        move_str = self.minimax(game, self.depth, True, game_history)[1]
-        game.load_snapshot(game_history)
-        start = (move_str[-4],int(move_str[-3]))
-        end = (move_str[-2], int(move_str[-1]))
+        if self.workers != 1:
+            return self.choose_move_parallel(game)
+        self.nodes = 0
+        if self.tt:
+            self.tt.new_search()
+        self.principal_variation = [decode_move(move) for move in
+                                    self.minimax(game, self.depth, True)[1]]
+        start, end = self.principal_variation[0]
+        return start, end
+
+
+    def choose_move_parallel(self, game):
+        """
+        Search each root move in a pool of worker processes, and
+        pick the best (the first one found, if several score the
+        same, as when searching them in turn).
+        """
+        game.next_to_play = self.colour
+        moves = game.get_all_possible_moves(self.colour, encoded=True)
+        fen, castled = position_args(game)
+        jobs = [(fen, castled, move, self.colour, self.depth,
+                 self.tt_size_mb, self.evaluator_name,
+                 self.quiescence_depth) for move in moves]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(search_root_move, jobs))
+        self.nodes = 1 + sum(nodes for value, nodes in results)
+        best_value = -2 * MATE_SCORE
+        best_move = None
+        for move, (value, nodes) in zip(moves, results):
+            if value > best_value:
+                best_value = value
+                best_move = move
+        start, end = decode_move(best_move)
+        self.principal_variation = [(start, end)]
+        return start, end
+
+
+def gives_check(game, move):
+    """
+    Would the piece making this move attack the opposing king
+    from its destination square?  (Only looks for direct checks,
+    which is good enough for ordering moves.)
+    """
+    start_pos, end_pos = move
+    board = game.board
+    p = board.piece_at(start_pos)
+    king_pos = board.king_position(other_colour(p.colour))
+    if king_pos is None:
+        return False
+    if p.piece_type == "Pawn":
+        return king_pos in PAWN_TAKES[p.colour][end_pos]
+    if p.piece_type == "Knight":
+        return king_pos in KNIGHT_MOVES[end_pos]
+    if p.piece_type == "King":
+        return False
+    directions = {"Rook": ROOK_DIRECTIONS,
+                  "Bishop": BISHOP_DIRECTIONS,
+                  "Queen": QUEEN_DIRECTIONS}[p.piece_type]
+    occupied = board.occupied & ~(1 << (SQUARE_INDEX[start_pos]))
+    for direction in directions:
+        ray, blocker = sliding_attacks(end_pos, direction, occupied)
+        if blocker == king_pos:
+            return True
+    return False
+
+
+class AlphaBetaPlayer(MinimaxPlayer):
+    """
+    Minimax search with alpha-beta pruning, written in 'negamax' form
+    (every score is from the point of view of the side to play).
+    Moves are searched in the order: best move from the transposition
+    table, then captures (most valuable victim, least valuable
+    attacker first), promotions, and checks, then the 'killer' moves
+    that last caused a cutoff at the same ply, then the other quiet
+    moves by how often (and how deep) they have caused cutoffs before
+    (the 'history' heuristic).  Killers and history are kept from one
+    search to the next, for as long as we're playing the same game.
+    Inside the search, moves are integers (see Moves.py), so these
+    tables, the transposition table and the principal variation
+    table all hold integers.
+    Two kinds of selective search can be switched on or off:
+    * null_move: if passing would still leave the score above beta,
+      a shallower search, assume the real moves will too and stop.
+      Not used in check, or when the side to play has only pawns
+      (where having to move can be a disadvantage).
+    * late_move_reductions: quiet moves ordered late are searched a
+      ply less deep, and only searched fully if they look good.
+    With pvs ('principal variation search'), only the first move at
+    each node gets a full window: the rest are searched with a null
+    window, just to show they are no better, and searched again
+    properly if they are.
+    How often each was used is counted in self.stats.
+    The search is iterative deepening: depth 1, 2, ... up to depth,
+    each starting with the best move from the last.  Each depth after
+    the first is searched with an 'aspiration window' of
+    aspiration_window either side of the last score (0 to switch this
+    off), widened and searched again if the score is outside it.
+    The principal variation is kept in a table as the search goes,
+    and the one from the last completed depth is left in
+    self.principal_variation.  If time_limit
+    (seconds) or node_limit is given, the search stops when it runs out,
+    and the move from the last completed depth is played.
+    The evaluator and quiescence search are as for MinimaxPlayer.
+    """
+    description = "alpha-beta search"
+
+    def __init__(self, colour, depth=3, tt_size_mb=16,
+                 time_limit=None, node_limit=None, evaluator="pieces",
+                 quiescence_depth=4, null_move=True,
+                 late_move_reductions=True, pvs=True,
+                 aspiration_window=ASPIRATION_WINDOW):
+        super().__init__(colour, depth, tt_size_mb, evaluator,
+                         quiescence_depth=quiescence_depth)
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = None
+        self.completed_depth = 0
+        self.root_best = None
+        self.killers = {}
+        self.history_scores = {}
+        self.heuristics_game = None
+        self.null_move = null_move
+        self.late_move_reductions = late_move_reductions
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.stats = {}
+        self.clear_stats()
+
+
+    def clear_stats(self):
+        self.stats = {"null_move_searches": 0,
+                      "null_move_cutoffs": 0,
+                      "reductions": 0,
+                      "re_searches": 0,
+                      "pvs_re_searches": 0,
+                      "aspiration_re_searches": 0}
+
+
+    def clear_heuristics(self):
+        """
+        Forget the killer moves and history scores.
+        """
+        self.killers = {}
+        self.history_scores = {}
+
+
+    def record_cutoff(self, move, depth, ply):
+        """
+        A quiet move caused a beta cutoff: make it a killer for this
+        ply, and add to its history score (more for deeper searches,
+        where a cutoff saves more work).
+        """
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[len(KILLER_SCORES):]
+        self.history_scores[move] = self.history_scores.get(move, 0) \
+            + depth * depth
+
+
+    def move_order_score(self, game, move, tt_move=None, ply=None):
+        """
+        Higher scores get searched first.  Moves are integers, as
+        in Moves.py.
+        """
+        if move == tt_move:
+            return 10000
+        score = 0
+        start_end = MOVE_TUPLES[move & FROM_TO_MASK]
+        if move & CAPTURE:
+            ## King.value is 100, so a king taking anything still
+            ## comes out above all non-captures.
+            score += 1000 + 100 * game.board.piece_at(start_end[1]).value \
+                - game.board.piece_at(start_end[0]).value
+        if move & PROMOTION:
+            score += 800
+        if gives_check(game, start_end):
+            score += 500
+        if score == 0:
+            killers = self.killers.get(ply, [])
+            if move in killers:
+                return KILLER_SCORES[killers.index(move)]
+            history = self.history_scores.get(move, 0)
+            score = HISTORY_MAX * history / (history + HISTORY_SCALE)
+        return score
+
+
+    def order_moves(self, game, moves, tt_move=None, ply=None):
+        return sorted(moves,
+                      key=lambda m: self.move_order_score(game, m, tt_move,
+                                                          ply),
+                      reverse=True)
+
+
+    def has_pieces(self, game, colour):
+        """
+        Does this side have anything apart from its king and pawns?
+        """
+        for p in game.board.pieces:
+            if p.colour == colour and p.piece_type not in ("King", "Pawn"):
+                return True
+        return False
+
+
+    def alphabeta(self, game, depth, alpha, beta, ply=1, allow_null=True):
+        """
+        Return the score of the position searched to the given depth,
+        assuming it is between alpha and beta.  ply is how many moves
+        we are from the root of the search, and allow_null is False
+        straight after a null move, so we don't pass twice in a row.
+        """
+        self.nodes += 1
+        self.check_budget()
+        self.pv_table[ply] = []
+        key = game.board.zobrist_key
+        alpha_orig = alpha
+        tt_move = None
+        if self.tt:
+            entry = self.tt.probe(key)
+            if entry:
+                tt_move = entry[4]
+                if entry[1] >= depth:
+                    score, bound = entry[2], entry[3]
+                    if bound == EXACT:
+                        return score
+                    if bound == LOWER_BOUND:
+                        alpha = max(alpha, score)
+                    elif bound == UPPER_BOUND:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return score
+        if depth == 0:
+            return self.quiescence(game, alpha, beta)
+        colour = game.next_to_play
+        in_check = game.is_check(colour)
+        if self.null_move and allow_null and not in_check and \
+           depth > NULL_MOVE_REDUCTION and self.has_pieces(game, colour):
+            self.stats["null_move_searches"] += 1
+            game.make_null_move()
+            value = -self.alphabeta(game, depth - 1 - NULL_MOVE_REDUCTION,
+                                    -beta, -beta + NULL_WINDOW, ply + 1,
+                                    allow_null=False)
+            game.unmake_move()
+            if value >= beta:
+                self.stats["null_move_cutoffs"] += 1
+                return beta
+        moves = game.get_all_possible_moves(colour, encoded=True)
+        if len(moves) == 0:
+            ## checkmate or stalemate
+            return -MATE_SCORE if in_check else 0.
+        best_value = -2 * MATE_SCORE
+        best_move = None
+        for i, move in enumerate(self.order_moves(game, moves, tt_move, ply)):
+            quiet = not move & (CAPTURE | PROMOTION)
+            reduce = self.late_move_reductions and quiet and \
+                i >= LMR_FULL_DEPTH_MOVES and depth >= LMR_MIN_DEPTH and \
+                not in_check and not gives_check(game, decode_move(move))
+            game.make_encoded_move(move)
+            value = self.search_move(game, depth - 1, alpha, beta, ply,
+                                     i == 0, reduce)
+            game.unmake_move()
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+                self.update_pv(ply, move)
+            if alpha >= beta:
+                if quiet:
+                    self.record_cutoff(move, depth, ply)
+                break
+        if self.tt:
+            if best_value <= alpha_orig:
+                bound = UPPER_BOUND
+            elif best_value >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            self.tt.store(key, depth, best_value, bound, best_move)
+        return best_value
+
+
+    def search_move(self, game, depth, alpha, beta, ply, first, reduce):
+        """
+        Score (for the side that just moved) of the position after a
+        move from a node at the given ply, searched to depth.  Late
+        moves picked out for a reduction are first searched a ply
+        shallower, and with pvs, moves other than the first with a
+        null window, each searched again (deeper, or with the full
+        window) only if it might raise alpha.
+        """
+        if reduce:
+            self.stats["reductions"] += 1
+            value = -self.alphabeta(game, depth - 1, -alpha - NULL_WINDOW,
+                                    -alpha, ply + 1)
+            if value <= alpha:
+                return value
+            self.stats["re_searches"] += 1
+        if self.pvs and not first:
+            value = -self.alphabeta(game, depth, -alpha - NULL_WINDOW,
+                                    -alpha, ply + 1)
+            if value <= alpha or value >= beta:
+                return value
+            self.stats["pvs_re_searches"] += 1
+        return -self.alphabeta(game, depth, -beta, -alpha, ply + 1)
+
+
+    def check_budget(self):
+        """
+        Stop the search if we have used up the time or node budget.
+        Only look at the clock every so often, as it isn't free.
+        """
+        if self.node_limit and self.nodes > self.node_limit:
+            raise SearchTimeout()
+        if self.deadline and self.nodes % 64 == 0 \
+           and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+
+    def search_root(self, game, depth, alpha=-2*MATE_SCORE,
+                    beta=2*MATE_SCORE, first_move=None):
+        """
+        Search all moves from the current position, returning the
+        best score and move.  If the best score is not above alpha,
+        or is at least beta, it is only a bound on the real score.
+        The best move so far is kept in self.root_best, in case the
+        search runs out of time part way through.
+        """
+        alpha_orig = alpha
+        best_value = -2 * MATE_SCORE
+        best_move = None
+        self.pv_table[0] = []
+        moves = game.get_all_possible_moves(game.next_to_play, encoded=True)
+        for i, move in enumerate(self.order_moves(game, moves, first_move)):
+            game.make_encoded_move(move)
+            value = self.search_move(game, depth - 1, alpha, beta, 0,
+                                     i == 0, False)
+            game.unmake_move()
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+                self.root_best = move
+                self.update_pv(0, move)
+            if alpha >= beta:
+                break
+        if self.tt and best_move:
+            if best_value <= alpha_orig:
+                bound = UPPER_BOUND
+            elif best_value >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            self.tt.store(game.board.zobrist_key, depth, best_value,
+                          bound, best_move)
+        return best_value, best_move
+
+
+    def search_aspiration(self, game, depth, guess, first_move=None):
+        """
+        Search the root to the given depth, first with a window
+        around guess (the score from the last depth), widening it
+        on whichever side the score falls outside until it doesn't.
+        """
+        if not self.aspiration_window or guess is None:
+            return self.search_root(game, depth, first_move=first_move)
+        window = self.aspiration_window
+        alpha, beta = guess - window, guess + window
+        while True:
+            value, move = self.search_root(game, depth, alpha, beta,
+                                           first_move)
+            if alpha < value < beta:
+                return value, move
+            self.stats["aspiration_re_searches"] += 1
+            window *= ASPIRATION_GROWTH
+            if value <= alpha:
+                alpha = guess - window if window < MATE_SCORE \
+                        else -2 * MATE_SCORE
+            else:
+                beta = guess + window if window < MATE_SCORE \
+                       else 2 * MATE_SCORE
+                first_move = move
+
+
+    def choose_move(self, game):
+        """
+        Return start and end position based on alpha-beta search.
+        """
+        self.nodes = 0
+        self.completed_depth = 0
+        self.root_best = None
+        self.clear_stats()
+        if self.time_limit:
+            self.deadline = time.perf_counter() + self.time_limit
+        if self.tt:
+            self.tt.new_search()
+        if game is not self.heuristics_game:
+            self.clear_heuristics()
+            self.heuristics_game = game
+        else:
+            ## older history counts for less
+            self.history_scores = {move: score // 2 for move, score
+                                   in self.history_scores.items()
+                                   if score > 1}
+        best_move = None
+        score = None
+        self.principal_variation = []
+        ## so we can take back any moves left on the board if
+        ## the search is stopped part way through.
+        root_undo_length = len(game.undo_stack)
+        try:
+            for depth in range(1, self.depth + 1):
+                score, best_move = self.search_aspiration(game, depth, score,
+                                                          best_move)
+                self.principal_variation = [decode_move(move) for move
+                                            in self.pv_table[0]]
+                self.completed_depth = depth
+        except SearchTimeout:
+            while len(game.undo_stack) > root_undo_length:
+                game.unmake_move()
+            if best_move is None:
+                ## didn't even finish depth 1 - take the best so far,
+                ## or failing that, any legal move.
+                best_move = self.root_best or \
+                    game.get_all_possible_moves(game.next_to_play,
+                                                encoded=True)[0]
+                self.principal_variation = [decode_move(best_move)]
+        self.deadline = None
+        start, end = decode_move(best_move)
+        return start, end
+
+
+class LazySMPPlayer(AlphaBetaPlayer):
+    """
+    Alpha-beta search spread over several processes, 'Lazy SMP' style:
+    every worker searches the whole position, but they all share one
+    transposition table (in shared memory), so each benefits from what
+    the others have found.  At each iteration of the iterative
+    deepening, half the workers search one ply deeper than the rest,
+    so they don't all follow the same path through the tree.
+    After each iteration, the move from the deepest finished search
+    is kept, and its search's score and move start the next one.
+    Entries in the shared table are aged by iteration, so those from
+    shallower iterations are the first to be replaced.
+    workers=None means one per CPU.
+    """
+    description = "a parallel (Lazy SMP) alpha-beta search"
+
+    def __init__(self, colour, depth=3, tt_size_mb=16, time_limit=None,
+                 evaluator="pieces", workers=None, quiescence_depth=4):
+        ## the table is made in shared memory for each move, so
+        ## there is no local one
+        super().__init__(colour, depth, tt_size_mb=0, time_limit=time_limit,
+                         evaluator=evaluator,
+                         quiescence_depth=quiescence_depth)
+        self.tt_size_mb = tt_size_mb
+        self.workers = workers or os.cpu_count() or 1
+
+
+    def choose_move(self, game):
+        """
+        Return start and end position based on searches by all
+        the workers, for each depth up to self.depth.
+        """
+        self.nodes = 0
+        self.completed_depth = 0
+        self.principal_variation = []
+        deadline = time.time() + self.time_limit if self.time_limit \
+                   else None
+        fen, castled = position_args(game)
+        best_move = None
+        ## a new table for each move, freed when the search is done
+        table = SharedTranspositionTable(self.tt_size_mb)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     initializer=attach_shared_table,
+                                     initargs=(self.tt_size_mb,
+                                               table.name)) as pool:
+                for depth in range(1, self.depth + 1):
+                    time_left = deadline - time.time() if deadline else None
+                    if time_left is not None and time_left <= 0:
+                        break
+                    jobs = [(fen, castled, min(depth + i % 2, self.depth),
+                             depth, best_move, time_left,
+                             self.evaluator_name, self.quiescence_depth)
+                            for i in range(self.workers)]
+                    results = list(pool.map(search_shared, jobs))
+                    self.nodes += sum(result[3] for result in results)
+                    finished = [result for result in results
+                                if result[2] is not None]
+                    if not finished:
+                        break
+                    ## the first of the deepest searches to finish
+                    deepest = max(finished, key=lambda result: result[0])
+                    best_move = deepest[2]
+                    self.principal_variation = [decode_move(move) for move
+                                                in deepest[4]]
+                    self.completed_depth = deepest[0]
+                    if self.completed_depth >= self.depth:
+                        break
+        finally:
+            table.close(unlink=True)
+        if best_move is None:
+            best_move = game.get_all_possible_moves(game.next_to_play,
+                                                    encoded=True)[0]
+            self.principal_variation = [decode_move(best_move)]
+        start, end = decode_move(best_move)
         return start, end
 
 
 methods = {"Random": RandomMovePlayer,
            "BestNextPoints" : BestNextPointsPlayer,
-           "Minimax": MinimaxPlayer
+           "Minimax": MinimaxPlayer,
+           "AlphaBeta": AlphaBetaPlayer,
+           "LazySMP": LazySMPPlayer
            }
@@ -0,0 +1,55 @@
+"""
+Moves packed into 16-bit integers, for the search: bits 0-5 are the
+square moved to and bits 6-11 the square moved from (numbered A1=0 ...
+H8=63, as in Board.SQUARE_INDEX), and the bits above that are flags
+for captures, promotions and castling.  Integers are cheaper to make,
+compare and keep in tables than ((col, row), (col, row)) tuples, and
+the flags save looking at the board again to see what kind of move
+it is.  The tuple for every (from, to) pair is built once, here, so
+going back to the tuple form doesn't make a new one.
+"""
+
+from Board import SQUARES, SQUARE_INDEX
+
+## no move at all (A1 to A1 is never a real move)
+NO_MOVE = 0
+CAPTURE = 1 << 12
+PROMOTION = 1 << 13
+CASTLE = 1 << 14
+## the from and to squares, without the flags
+FROM_TO_MASK = (1 << 12) - 1
+
+MOVE_TUPLES = [(SQUARES[i >> 6], SQUARES[i & 63]) for i in range(1 << 12)]
+
+
+def encode_move(start_pos, end_pos, flags=0):
+    """
+    Integer for the move from start_pos to end_pos, with the
+    given flags (CAPTURE, PROMOTION, CASTLE, or'ed together).
+    """
+    return (SQUARE_INDEX[start_pos] << 6) | SQUARE_INDEX[end_pos] | flags
+
+
+def decode_move(move):
+    """
+    The move as a (start_pos, end_pos) tuple.
+    """
+    return MOVE_TUPLES[move & FROM_TO_MASK]
+
+
+def move_to_str(move):
+    """
+    The move as a string like "E2E4".
+    """
+    start, end = MOVE_TUPLES[move & FROM_TO_MASK]
+    return "{}{}{}{}".format(start[0], start[1], end[0], end[1])
+
+
+def str_to_move(move_str, flags=0):
+    """
+    Integer for a move given as a string like "E2E4" (Game.encode_move
+    works out the flags from the position).
+    """
+    move_str = move_str.upper()
+    return encode_move((move_str[0], int(move_str[1])),
+                       (move_str[2], int(move_str[3])), flags)
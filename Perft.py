@@ -0,0 +1,163 @@
+"""
+Perft ("performance test"): count the leaf nodes of the tree of legal
+moves to a given depth.  The counts for the standard test positions are
+well known, so comparing against them catches move generation bugs,
+and timing the count measures how fast the moves are generated.
+
+Usage:
+    python Perft.py --depth 3
+    python Perft.py --depth 2 --engine bitboard --suite
+    python Perft.py --depth 2 --fen "8/8/8/8/8/8/8/K6k w - - 0 1"
+"""
+
+import time
+import argparse
+
+from Chess import Game, START_FEN, ENGINES
+
+## standard test positions.  There is no en passant in this program,
+## so counts for positions where it is possible differ from the
+## published ones, and so do counts for positions with under-promotions,
+## since pawns always become queens.  The expected counts here are
+## for this program's rules.
+SUITE = {
+    "start": (START_FEN, [20, 400, 8902]),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R"
+                 " w KQkq - 0 1", [48, 2038, 97766]),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  [14, 191, 2810]),
+    "position4": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1"
+                  " w kq - 0 1", [6, 228]),
+    "position5": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R"
+                  " w KQ - 1 8", [41, 1373])
+}
+
+
+class PerftStats(object):
+    """
+    Counts of leaf nodes at the final depth, split by the
+    kind of move that reached them.
+    """
+    def __init__(self):
+        self.nodes = 0
+        self.captures = 0
+        self.castles = 0
+        self.promotions = 0
+        self.checks = 0
+
+    def as_dict(self):
+        return {"nodes": self.nodes,
+                "captures": self.captures,
+                "castles": self.castles,
+                "promotions": self.promotions,
+                "checks": self.checks}
+
+
+def perft(game, depth, stats=None):
+    """
+    Number of leaf nodes depth moves from the current position,
+    using make_move/unmake_move so the game is unchanged afterwards.
+    If stats is given, the moves to the leaves are also classified.
+    """
+    if depth == 0:
+        return 1
+    colour = game.next_to_play
+    moves = game.get_all_possible_moves(colour)
+    if depth == 1 and stats is None:
+        return len(moves)
+    nodes = 0
+    for start, end in moves:
+        if depth == 1:
+            stats.nodes += 1
+            if game.board.piece_at(end):
+                stats.captures += 1
+            if game.is_castling_move(start, end):
+                stats.castles += 1
+            elif game.is_promotion_move(start, end):
+                stats.promotions += 1
+        game.make_move(start, end)
+        if depth == 1:
+            nodes += 1
+            if game.is_check(game.next_to_play):
+                stats.checks += 1
+        else:
+            nodes += perft(game, depth - 1, stats)
+        game.unmake_move()
+    return nodes
+
+
+def divide(game, depth):
+    """
+    Leaf node count below each legal move, for tracking down
+    which move a wrong perft count comes from.
+    """
+    counts = {}
+    for start, end in game.get_all_possible_moves(game.next_to_play):
+        game.make_move(start, end)
+        counts[start[0]+str(start[1])+end[0]+str(end[1])] = \
+            perft(game, depth - 1)
+        game.unmake_move()
+    return counts
+
+
+def run_perft(fen, depth, engine="pieces", verbose=True):
+    """
+    Perft to each depth from 1 up to depth, timing each one.
+    Returns a list of dicts, one per depth, with the counts,
+    time taken and nodes per second.
+    """
+    results = []
+    for d in range(1, depth + 1):
+        game = Game(engine=engine)
+        game.load_fen(fen)
+        stats = PerftStats()
+        start_time = time.time()
+        perft(game, d, stats)
+        elapsed = time.time() - start_time
+        result = stats.as_dict()
+        result["depth"] = d
+        result["time"] = elapsed
+        result["nps"] = stats.nodes / elapsed if elapsed > 0 else 0.
+        results.append(result)
+        if verbose:
+            print("depth {depth}: {nodes} nodes ({captures} captures, "
+                  "{castles} castles, {promotions} promotions, "
+                  "{checks} checks) in {time:.3f}s, {nps:.0f} nodes/s"\
+                  .format(**result))
+    return results
+
+
+def run_suite(depth, engine="pieces", verbose=True):
+    """
+    Perft on every position in SUITE, to depth or the deepest known
+    count, whichever is less.  Returns True if all counts were right.
+    """
+    all_ok = True
+    for name, (fen, expected) in SUITE.items():
+        if verbose:
+            print(name)
+        results = run_perft(fen, min(depth, len(expected)), engine, verbose)
+        for result in results:
+            if result["nodes"] != expected[result["depth"]-1]:
+                all_ok = False
+                if verbose:
+                    print("  WRONG at depth {}: expected {}"\
+                          .format(result["depth"],
+                                  expected[result["depth"]-1]))
+    return all_ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count and time legal moves")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--engine", choices=list(ENGINES.keys()),
+                        default="pieces")
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--suite", action="store_true",
+                        help="run the standard test positions")
+    args = parser.parse_args()
+    if args.suite:
+        ok = run_suite(args.depth, args.engine)
+        print("all counts correct" if ok else "SOME COUNTS WRONG")
+    else:
+        run_perft(args.fen, args.depth, args.engine)
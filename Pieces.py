@@ -8,6 +8,9 @@ All pieces generate and hold:
 """
 
 from Board import Board, COLNAMES, PieceBase
+from Tables import KNIGHT_MOVES, KING_MOVES, PAWN_TAKES, PAWN_PUSHES, \
+    CASTLING_POSITIONS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, QUEEN_DIRECTIONS, \
+    sliding_attacks
 
 
 class Pawn(PieceBase):
@@ -22,34 +25,16 @@ class Pawn(PieceBase):
         two-squares ahead, and diagonally ahead
         of the current position.
         """
-        current_col = self.current_position[0]
-        take_col_indices = [
-            COLNAMES.index(current_col) - 1,
-            COLNAMES.index(current_col) + 1
-        ]
-        if self.colour == "WHITE":
-            direction = 1
-        else:
-            direction = -1
-
-        pos_one_ahead = (self.current_position[0],
-                         self.current_position[1]+direction)
-        pos_two_ahead = (self.current_position[0],
-                         self.current_position[1]+2*direction)
-        pos_takes = []
-        for i in take_col_indices:
-            if i in range(8):
-                pos_takes.append((COLNAMES[i],
-                                  self.current_position[1]+direction))
-                pass
-            pass
-
+        pos_one_ahead, pos_two_ahead = \
+            PAWN_PUSHES[self.colour][self.current_position]
+        pos_takes = list(PAWN_TAKES[self.colour][self.current_position])
         return pos_one_ahead, pos_two_ahead, pos_takes
 
 
     def find_available_moves(self, board):
         self.available_moves = []
         one_ahead, two_ahead, takes = self.find_potential_positions()
+        self.threatens = takes
         if board.is_empty(one_ahead) and board.in_bounds(one_ahead):
             self.available_moves.append(one_ahead)
             if not self.has_moved and board.is_empty(two_ahead) and \
@@ -72,6 +57,19 @@ class Pawn(PieceBase):
         self.threatens = self.find_potential_positions()[2]
 
 
+    def is_affected_by(self, positions):
+        """
+        A pawn's moves also depend on whether the squares ahead
+        of it are empty.
+        """
+        if super().is_affected_by(positions):
+            return True
+        for pos in PAWN_PUSHES[self.colour][self.current_position]:
+            if pos in positions:
+                return True
+        return False
+
+
 class King(PieceBase):
 
     def __init__(self, colour):
@@ -85,31 +83,16 @@ class King(PieceBase):
         current position, plus the endpoints of
         castling.
         """
-        adjacent_positions = []
-        current_colnum = COLNAMES.index(self.current_position[0])
-        for row_move in range(-1,2):
-            new_row = self.current_position[1] + row_move
-            if new_row not in range(1,9):
-                continue
-            for col_move in range(-1,2):
-                if row_move==0 and col_move==0:
-                    continue
-                new_colnum = current_colnum + col_move
-                if new_colnum not in range(8):
-                    continue
-                adjacent_positions.append((COLNAMES[new_colnum],
-                                           new_row))
+        adjacent_positions = KING_MOVES[self.current_position]
         ## we will deal with castling separately
-        if self.colour == "WHITE":
-            castling_positions = [("C",1),("G",1)]
-        else:
-            castling_positions = [("C",8),("G",8)]
+        castling_positions = CASTLING_POSITIONS[self.colour]
         return adjacent_positions, castling_positions
 
 
     def find_available_moves(self, board):
         self.available_moves = []
         adj_pos, castle_pos = self.find_potential_positions()
+        self.threatens = list(adj_pos)
         # test whether we can move to adjacent square
         for pos in adj_pos:
             if board.is_threatened(pos, self.colour):
@@ -152,16 +135,21 @@ class King(PieceBase):
             p =  board.piece_at((rook_column,row))
             if p.piece_type != "Rook" or p.has_moved:
                 return False
-        ## now check if the coast is clear to the target square
-        ## (no other pieces, not going through check.
+        ## now check the coast is clear: no pieces anywhere between
+        ## the king and the rook (including B1/B8 when castling queen
+        ## side), and not going through check on the way to the
+        ## target square.
+        rook_colnum = COLNAMES.index(rook_column)
+        for colnum in range(current_colnum + direction, rook_colnum,
+                            direction):
+            if not board.is_empty((COLNAMES[colnum], row)):
+                return False
         for colnum in range(current_colnum,
                             target_colnum+direction,
                             direction):
             col = COLNAMES[colnum]
             if board.is_threatened((col, row), self.colour):
                 return False
-            if colnum != current_colnum and not board.is_empty((col,row)):
-                return False
         return True
 
     def find_positions_threatened(self, board):
@@ -169,132 +157,79 @@ class King(PieceBase):
         Return the squares that this King is
         currently threatening, i.e. all adjacent squares.
         """
-        self.threatens = self.find_potential_positions()[0]
+        self.threatens = list(self.find_potential_positions()[0])
 
 
+    def is_affected_by(self, positions):
+        """
+        The king's moves depend on which squares the other side
+        threatens, and whether it can castle, so always update it.
+        """
+        return True
+
 
-class Rook(PieceBase):
-    def __init__(self, colour):
-        super().__init__(colour, "Rook")
-        self.value = 5
 
+class SlidingPiece(PieceBase):
+    """
+    Base class for pieces that move any distance along a set of
+    directions (rooks, bishops and queens).  The squares along each
+    direction, and where they are cut short by a blocking piece, come
+    from the precomputed ray tables.
+    """
+    directions = ()
 
     def find_available_moves(self, board):
         self.available_moves = []
         self.threatens = []
-        current_col = self.current_position[0]
-        current_row = self.current_position[1]
-        current_colnum = COLNAMES.index(current_col)
-        loop_configs = {"left":  range(current_colnum-1,-1,-1),
-                        "right": range(current_colnum+1,8),
-                        "up": range(current_row+1,9),
-                        "down": range(current_row-1,0,-1)
-                        }
-        ## go as far as we can in each direction
-        for direction, loop in loop_configs.items():
-            for i in loop:
-                if direction == "left" or direction == "right":
-                    pos = (COLNAMES[i], current_row)
-                else:
-                    pos = (COLNAMES[current_colnum], i)
-                if board.is_empty(pos):
-                    self.available_moves.append(pos)
-                    self.threatens.append(pos)
-                elif board.piece_at(pos).colour != self.colour:
-                    ## opposite colour piece - can take,
-                    ## but can't move beyond
-                    self.threatens.append(pos)
-                    self.available_moves.append(pos)
-                    break
-                else:
-                    ## same colour piece - can't go there or beyond
-                    self.threatens.append(pos)
-                    break
+        for direction in self.directions:
+            ray, blocker = sliding_attacks(self.current_position,
+                                           direction,
+                                           board.occupied)
+            ## we threaten everything up to and including the
+            ## first piece in the way
+            self.threatens += ray
+            if blocker is None or \
+               board.piece_at(blocker).colour != self.colour:
+                ## empty squares, then possibly a piece we can take
+                self.available_moves += ray
+            else:
+                ## same colour piece - can't go there
+                self.available_moves += ray[:-1]
 
 
     def find_positions_threatened(self, board):
         """
-        Return the squares that this rook is
+        Return the squares that this piece is
         currently threatening.  In practice, this is the same as
-        the list of available moves
+        the list of available moves, plus any square with
+        a piece of the same colour that is in the way.
         """
-        if len(self.threatens)==0:
-            self.find_available_moves(board)
+        self.find_available_moves(board)
 
 
-class Bishop(PieceBase):
+class Rook(SlidingPiece):
+    directions = ROOK_DIRECTIONS
 
     def __init__(self, colour):
-        super().__init__(colour, "Bishop")
-        self.value = 3
+        super().__init__(colour, "Rook")
+        self.value = 5
 
-    def find_available_moves(self, board):
-        self.available_moves = []
-        self.threatens = []
-        starting_row = self.current_position[1]
-        starting_colnum = COLNAMES.index(self.current_position[0])
-        step_directions = [(1,1),(1,-1),(-1,1),(-1,-1)]
-        for direction in step_directions:
-            colnum = starting_colnum + direction[0]
-            row = starting_row + direction[1]
-            while colnum in range(8) and row in range(1,9):
-                pos = (COLNAMES[colnum],row)
-                if board.is_empty(pos):
-                    self.threatens.append(pos)
-                    self.available_moves.append(pos)
-                elif board.piece_at(pos).colour != self.colour:
-                    self.available_moves.append(pos)
-                    self.threatens.append(pos)
-                    break
-                else:
-                    self.threatens.append(pos)
-                    break
-                colnum += direction[0]
-                row += direction[1]
 
-    def find_positions_threatened(self, board):
-        if len(self.threatens)==0:
-            self.find_available_moves(board)
+class Bishop(SlidingPiece):
+    directions = BISHOP_DIRECTIONS
 
+    def __init__(self, colour):
+        super().__init__(colour, "Bishop")
+        self.value = 3
 
 
-class Queen(PieceBase):
+class Queen(SlidingPiece):
+    directions = QUEEN_DIRECTIONS
 
     def __init__(self, colour):
         super().__init__(colour, "Queen")
         self.value = 9
 
-    def find_available_moves(self, board):
-        self.available_moves = []
-        self.threatens = []
-        starting_row = self.current_position[1]
-        starting_colnum = COLNAMES.index(self.current_position[0])
-        step_directions = [
-            (1,0),(0,1),(-1,0),(0,-1),
-            (1,1),(1,-1),(-1,1),(-1,-1)
-        ]
-        for direction in step_directions:
-            colnum = starting_colnum + direction[0]
-            row = starting_row + direction[1]
-            while colnum in range(8) and row in range(1,9):
-                pos = (COLNAMES[colnum],row)
-                if board.is_empty(pos):
-                    self.available_moves.append(pos)
-                    self.threatens.append(pos)
-                elif board.piece_at(pos).colour != self.colour:
-                    self.available_moves.append(pos)
-                    self.threatens.append(pos)
-                    break
-                else:
-                    self.threatens.append(pos)
-                    break
-                colnum += direction[0]
-                row += direction[1]
-
-    def find_positions_threatened(self, board):
-        if len(self.threatens)==0:
-            self.find_available_moves(board)
-
 
 
 class Knight(PieceBase):
@@ -306,18 +241,7 @@ class Knight(PieceBase):
     def find_available_moves(self, board):
         self.available_moves = []
         self.threatens = []
-        starting_row = self.current_position[1]
-        starting_colnum = COLNAMES.index(self.current_position[0])
-        steps = [
-            (1,2),(2,1),(-1,2),(2,-1),
-            (1,-2),(-2,-1),(-2,1),(-1,-2)
-        ]
-        for step in steps:
-            colnum = starting_colnum + step[0]
-            row = starting_row + step[1]
-            if not (row in range(1,9) and colnum in range(8)):
-                continue
-            pos = (COLNAMES[colnum],row)
+        for pos in KNIGHT_MOVES[self.current_position]:
             if board.is_empty(pos):
                 self.available_moves.append(pos)
                 self.threatens.append(pos)
@@ -328,5 +252,4 @@ class Knight(PieceBase):
                 self.threatens.append(pos)
 
     def find_positions_threatened(self, board):
-        if len(self.threatens)==0:
-            self.find_available_moves(board)
+        self.find_available_moves(board)
@@ -0,0 +1,131 @@
+"""
+Lookup tables of the squares each piece can reach from every square
+of the board, built once when the module is imported, so that pieces
+don't need to redo the offset arithmetic and bounds checks every time
+they look for moves.
+All tables are dicts keyed on (col, row) position, apart from the
+bitmask tables used by the bitboard engine, which are lists indexed
+by square number.
+"""
+
+from Board import COLNAMES, SQUARES, SQUARE_INDEX
+
+## steps as (column offset, row offset)
+KNIGHT_STEPS = [(1,2),(2,1),(-1,2),(2,-1),
+                (1,-2),(-2,-1),(-2,1),(-1,-2)]
+KING_STEPS = [(-1,-1),(-1,0),(-1,1),
+              (0,-1),(0,1),
+              (1,-1),(1,0),(1,1)]
+PAWN_DIRECTIONS = {"WHITE": 1, "BLACK": -1}
+ROOK_DIRECTIONS = ((0,1),(1,0),(0,-1),(-1,0))
+BISHOP_DIRECTIONS = ((1,1),(-1,1),(1,-1),(-1,-1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+## directions in which the square number increases, so the nearest
+## blocker on a ray is the lowest set bit rather than the highest.
+POSITIVE_DIRECTIONS = frozenset([(0,1),(1,0),(1,1),(-1,1)])
+
+ALL_POSITIONS = [(col, row) for col in COLNAMES for row in range(1,9)]
+
+
+def offset_position(pos, step):
+    """
+    Position reached by applying step to pos, or None if
+    that would be off the board.
+    """
+    colnum = COLNAMES.index(pos[0]) + step[0]
+    row = pos[1] + step[1]
+    if colnum in range(8) and row in range(1,9):
+        return (COLNAMES[colnum], row)
+    return None
+
+
+def step_table(steps):
+    """
+    For each square, the tuple of squares one step away.
+    """
+    table = {}
+    for pos in ALL_POSITIONS:
+        targets = [offset_position(pos, step) for step in steps]
+        table[pos] = tuple(t for t in targets if t)
+    return table
+
+
+def pawn_push_table(colour):
+    """
+    For each square, the squares one and two ahead of a pawn.
+    These can be off the end of the board (checked by the pawn
+    using Board.in_bounds), so don't go through offset_position.
+    """
+    direction = PAWN_DIRECTIONS[colour]
+    return {(col, row): ((col, row + direction), (col, row + 2*direction))
+            for col, row in ALL_POSITIONS}
+
+
+KNIGHT_MOVES = step_table(KNIGHT_STEPS)
+KING_MOVES = step_table(KING_STEPS)
+PAWN_TAKES = {colour: step_table([(-1, d), (1, d)])
+              for colour, d in PAWN_DIRECTIONS.items()}
+PAWN_PUSHES = {colour: pawn_push_table(colour)
+               for colour in PAWN_DIRECTIONS.keys()}
+CASTLING_POSITIONS = {"WHITE": (("C",1),("G",1)),
+                      "BLACK": (("C",8),("G",8))}
+
+
+def ray(pos, direction):
+    """
+    Tuple of squares from pos (exclusive) to the edge of the board
+    in the given direction, nearest first.
+    """
+    squares = []
+    pos = offset_position(pos, direction)
+    while pos:
+        squares.append(pos)
+        pos = offset_position(pos, direction)
+    return tuple(squares)
+
+
+def mask(positions):
+    """
+    Bitmask with the bits for the given positions set.
+    """
+    bits = 0
+    for pos in positions:
+        bits |= 1 << SQUARE_INDEX[pos]
+    return bits
+
+
+## for every square and direction: the full ray, its bitmask, and
+## the part of the ray up to and including each possible blocker,
+## keyed on the square number of the blocker.
+RAYS = {pos: {d: ray(pos, d) for d in QUEEN_DIRECTIONS}
+        for pos in ALL_POSITIONS}
+RAY_MASKS = {d: [mask(RAYS[SQUARES[sq]][d]) for sq in range(64)]
+             for d in QUEEN_DIRECTIONS}
+BLOCKED_RAYS = {pos: {d: {SQUARE_INDEX[blocker]: RAYS[pos][d][:i+1]
+                          for i, blocker in enumerate(RAYS[pos][d])}
+                      for d in QUEEN_DIRECTIONS}
+                for pos in ALL_POSITIONS}
+
+
+def first_blocker(blockers, direction):
+    """
+    Square number of the blocker nearest the start of a ray,
+    given the bitmask of occupied squares on that ray.
+    """
+    if direction in POSITIVE_DIRECTIONS:
+        return (blockers & -blockers).bit_length() - 1
+    return blockers.bit_length() - 1
+
+
+def sliding_attacks(pos, direction, occupied):
+    """
+    Squares attacked from pos by a sliding piece in one direction,
+    given the bitmask of occupied squares.  Returns the tuple of
+    squares up to and including the first occupied one, and the
+    position of that blocker (None if the ray reaches the edge).
+    """
+    blockers = occupied & RAY_MASKS[direction][SQUARE_INDEX[pos]]
+    if not blockers:
+        return RAYS[pos][direction], None
+    first = first_blocker(blockers, direction)
+    return BLOCKED_RAYS[pos][direction][first], SQUARES[first]
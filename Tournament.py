@@ -0,0 +1,225 @@
+"""
+Play matches between the move choosers in MoveChooser.methods without
+any prompting, with games running in parallel in worker processes.
+Each finished game is written as one line of JSON to the results file
+as soon as it's done, with the winner, number of plies, and each
+side's time per move and nodes searched.  A game that fails with an
+exception is recorded with result "error" and the message, and the
+rest of the tournament carries on.
+
+Usage:
+    python Tournament.py --player Random --player AlphaBeta:depth=2 \
+        --games 10 --output results.jsonl
+Players are given as a name from MoveChooser.methods, optionally
+followed by ':' and comma-separated settings for the player's
+constructor.  Every player plays every other, as both colours.
+"""
+
+import io
+import json
+import time
+import random
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Chess import Game, START_FEN
+from MoveChooser import methods, other_colour
+
+## stop a game and call it a draw after this many plies
+DEFAULT_MAX_PLIES = 200
+
+
+def parse_value(value):
+    """
+    Setting from the command line as an int, float, bool or
+    None if it looks like one, otherwise as a string.
+    """
+    for convert in [int, float]:
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return {"True": True, "False": False, "None": None}.get(value, value)
+
+
+def parse_player(spec):
+    """
+    Split a player given as e.g. "AlphaBeta:depth=2,time_limit=0.5"
+    into the name and a dict of settings.
+    """
+    name, _, settings = spec.partition(":")
+    if not name in methods.keys():
+        raise RuntimeError("Unknown player {}".format(name))
+    kwargs = {}
+    for setting in settings.split(",") if settings else []:
+        key, _, value = setting.partition("=")
+        kwargs[key] = parse_value(value)
+    return name, kwargs
+
+
+def play_game(white, black, max_plies=DEFAULT_MAX_PLIES, seed=0,
+              fen=START_FEN):
+    """
+    Play one game between two players, each given as a spec string
+    (see parse_player).  Returns a dict of the result.
+    Anything the players or the game print is thrown away.
+    """
+    random.seed(seed)
+    specs = {"WHITE": white, "BLACK": black}
+    times = {"WHITE": [], "BLACK": []}
+    nodes = {"WHITE": 0, "BLACK": 0}
+    winner = None
+    result = "max_plies"
+    with redirect_stdout(io.StringIO()):
+        game = Game()
+        game.load_fen(fen)
+        players = {}
+        for colour, spec in specs.items():
+            name, kwargs = parse_player(spec)
+            players[colour] = methods[name](colour, **kwargs)
+        for ply in range(max_plies):
+            colour = game.next_to_play
+            if not game.get_all_possible_moves(colour):
+                if game.is_check(colour):
+                    winner = other_colour(colour)
+                    result = "checkmate"
+                else:
+                    result = "stalemate"
+                break
+            start_time = time.perf_counter()
+            start, end = players[colour].choose_move(game)
+            times[colour].append(time.perf_counter() - start_time)
+            nodes[colour] += getattr(players[colour], "nodes", 0)
+            if not game.is_legal_move(colour, start, end):
+                winner = other_colour(colour)
+                result = "illegal_move"
+                break
+            game.move(start, end)
+    return {"white": white,
+            "black": black,
+            "seed": seed,
+            "winner": winner,
+            "result": result,
+            "plies": len(game.history),
+            "time_per_move": {colour.lower(): sum(t) / len(t) if t else 0.
+                              for colour, t in times.items()},
+            "nodes": {colour.lower(): n for colour, n in nodes.items()},
+            "history": game.get_history_str()}
+
+
+def play_game_args(args):
+    return play_game(*args)
+
+
+def error_result(job, error):
+    """
+    Result for a game (given as the arguments to play_game)
+    that raised an exception rather than finishing.
+    """
+    white, black, max_plies, seed, fen = job
+    return {"white": white,
+            "black": black,
+            "seed": seed,
+            "winner": None,
+            "result": "error",
+            "error": "{}: {}".format(type(error).__name__, error),
+            "plies": 0,
+            "time_per_move": {"white": 0., "black": 0.},
+            "nodes": {"white": 0, "black": 0},
+            "history": ""}
+
+
+def pairings(players, games):
+    """
+    Every ordered pair of different players (so each plays each
+    of the others as both colours), games times over, each with
+    its own random seed.
+    """
+    matches = []
+    for white in players:
+        for black in players:
+            if white == black and len(players) > 1:
+                continue
+            for i in range(games):
+                matches.append((white, black))
+    return [(white, black, seed) for seed, (white, black)
+            in enumerate(matches)]
+
+
+def run_tournament(players, games=1, max_plies=DEFAULT_MAX_PLIES,
+                   workers=None, output=None, fen=START_FEN):
+    """
+    Play all the games, in a pool of worker processes (one per CPU
+    if workers is None), writing each result to the output file as
+    a line of JSON as soon as the game finishes.  A game that
+    raises an exception is recorded as an error (see error_result)
+    rather than stopping the tournament.
+    Returns the list of results, in the order they finished.
+    """
+    for spec in players:
+        parse_player(spec)
+    jobs = [(white, black, max_plies, seed, fen)
+            for white, black, seed in pairings(players, games)]
+    results = []
+    outfile = open(output, "a") if output else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(play_game_args, job): job
+                       for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as error:
+                    result = error_result(futures[future], error)
+                results.append(result)
+                if outfile:
+                    outfile.write(json.dumps(result) + "\n")
+                    outfile.flush()
+    finally:
+        if outfile:
+            outfile.close()
+    return results
+
+
+def summarise(results):
+    """
+    Points for each player: 1 for a win, 0.5 for any other
+    result that isn't a loss.  Games that ended in an error
+    don't score.
+    """
+    points = {}
+    for result in results:
+        for colour in ["WHITE", "BLACK"]:
+            player = result[colour.lower()]
+            points.setdefault(player, 0.)
+            if result["result"] == "error":
+                continue
+            if result["winner"] == colour:
+                points[player] += 1.
+            elif result["winner"] is None:
+                points[player] += 0.5
+    return points
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play automated matches")
+    parser.add_argument("--player", action="append", required=True,
+                        help="name from MoveChooser.methods, optionally "
+                        "followed by :key=value,... settings (repeat for "
+                        "each player)")
+    parser.add_argument("--games", type=int, default=1,
+                        help="games per pairing of players and colours")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default one per CPU)")
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--output", default="tournament.jsonl",
+                        help="file to add results to, one JSON line "
+                        "per game")
+    args = parser.parse_args()
+    results = run_tournament(args.player, args.games, args.max_plies,
+                             args.workers, args.output, args.fen)
+    for player, points in sorted(summarise(results).items(),
+                                 key=lambda item: -item[1]):
+        print("{}: {}".format(player, points))
@@ -0,0 +1,165 @@
+"""
+Fixed-size table of previously searched positions, keyed on the
+Zobrist hash of the position (Board.zobrist_key), so that the search
+doesn't have to redo positions it reaches by a different order of moves.
+The SharedTranspositionTable variant keeps its entries in shared memory,
+so that several search processes can use the same table, and only
+takes best moves in the 16-bit integer form from Moves.py.
+"""
+
+import struct
+import zlib
+from multiprocessing import shared_memory
+
+from Moves import NO_MOVE
+
+## what the stored score means: the exact value of the position, or
+## only a lower/upper bound on it (when the search was cut off).
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+## rough size in bytes of one stored entry (the tuple and the
+## objects in it, plus the slot in the list), used to turn a
+## memory limit into a number of entries.
+ENTRY_SIZE_BYTES = 200
+
+## layout of an entry in a SharedTranspositionTable: check word (the
+## key XORed with a checksum of the rest of the entry), depth, score,
+## bound, best move (as an integer, see Moves.py) and age.
+SHARED_ENTRY = struct.Struct("<QhdBHH")
+SHARED_DATA = struct.Struct("<hdBHH")
+EMPTY_ENTRY = bytes(SHARED_ENTRY.size)
+
+
+class TranspositionTable(object):
+    """
+    Each entry is a tuple (key, depth, score, bound, best_move, age),
+    stored in the slot given by the key modulo the table size.
+    When two positions want the same slot, the new one replaces the
+    old one if the old one is from a previous search, or was searched
+    to no greater depth.
+    """
+    def __init__(self, max_size_mb=16):
+        self.size = max(1, int(max_size_mb * 1024 * 1024 / ENTRY_SIZE_BYTES))
+        self.entries = [None] * self.size
+        self.age = 0
+        self.hits = 0
+        self.stores = 0
+
+
+    def new_search(self):
+        """
+        Mark the start of a new search, so that entries from
+        earlier searches are replaced first.
+        """
+        self.age += 1
+        self.hits = 0
+        self.stores = 0
+
+
+    def probe(self, key):
+        """
+        Return the entry for this position, or None if
+        it isn't in the table.
+        """
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+
+    def store(self, key, depth, score, bound, best_move):
+        """
+        Save the result of searching a position to some depth,
+        according to the replacement scheme.
+        """
+        index = key % self.size
+        existing = self.entries[index]
+        if existing is None or existing[0] == key \
+           or existing[5] != self.age or depth >= existing[1]:
+            self.entries[index] = (key, depth, score, bound, best_move,
+                                   self.age)
+            self.stores += 1
+
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Transposition table held in a block of shared memory, packed
+    as fixed-size entries (see SHARED_ENTRY), so that processes
+    searching at the same time can share results.
+    Entries are written without locking, so one process can read an
+    entry while another is half way through writing it.  The key is
+    stored XORed with a checksum of the rest of the entry, so a torn
+    entry just looks like a different position and is ignored.
+    The process that creates the table (name=None) should close it
+    with unlink=True when finished; other processes attach to it by
+    name, with the same max_size_mb.
+    """
+    def __init__(self, max_size_mb=16, name=None):
+        self.size = max(1, int(max_size_mb * 1024 * 1024 / SHARED_ENTRY.size))
+        if name is None:
+            ## new shared memory is all zeros, i.e. every slot empty
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=self.size * SHARED_ENTRY.size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.age = 0
+        self.hits = 0
+        self.stores = 0
+
+
+    def read_entry(self, index):
+        """
+        The entry in a slot, as (key, depth, score, bound, best_move,
+        age), or None if the slot is empty.
+        """
+        offset = index * SHARED_ENTRY.size
+        raw = bytes(self.memory.buf[offset:offset + SHARED_ENTRY.size])
+        if raw == EMPTY_ENTRY:
+            return None
+        check, depth, score, bound, move, age = SHARED_ENTRY.unpack(raw)
+        key = check ^ zlib.crc32(raw[8:])
+        return (key, depth, score, bound, move, age)
+
+
+    def probe(self, key):
+        entry = self.read_entry(key % self.size)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[:4] + (entry[4] or None, entry[5])
+        return None
+
+
+    def store(self, key, depth, score, bound, best_move):
+        index = key % self.size
+        existing = self.read_entry(index)
+        if existing is None or existing[0] == key \
+           or existing[5] != self.age & 0xFFFF or depth >= existing[1]:
+            data = SHARED_DATA.pack(depth, score, bound, best_move or NO_MOVE,
+                                    self.age & 0xFFFF)
+            check = key ^ zlib.crc32(data)
+            offset = index * SHARED_ENTRY.size
+            self.memory.buf[offset:offset + SHARED_ENTRY.size] = \
+                struct.pack("<Q", check) + data
+            self.stores += 1
+
+
+    def clear(self):
+        self.memory.buf[:self.size * SHARED_ENTRY.size] = \
+            bytes(self.size * SHARED_ENTRY.size)
+
+
+    def close(self, unlink=False):
+        """
+        Stop using the shared memory (and free it, if unlink).
+        """
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
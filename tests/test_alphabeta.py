@@ -0,0 +1,259 @@
+"""
+Test the alpha-beta search player.
+"""
+
+import pytest
+
+from Chess import Game
+from Pieces import King, Queen, Rook, Pawn, Knight
+from MoveChooser import AlphaBetaPlayer, MinimaxPlayer, methods, gives_check
+from Moves import str_to_move, decode_move
+
+
+def test_in_methods():
+    assert(methods["AlphaBeta"] == AlphaBetaPlayer)
+
+
+def test_minimax_settings_inherited():
+    player = AlphaBetaPlayer("WHITE", depth=2, tt_size_mb=1)
+    assert(player.tt_size_mb == 1)
+    assert(player.evaluator_name == "pieces")
+    assert(player.workers == 1)
+    assert(player.pv_table == {})
+
+
+def test_same_score_as_minimax():
+    g = Game()
+    g.move(("E",2),("E",4))
+    g.move(("E",7),("E",5))
+    minimax = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0)
+    alphabeta = AlphaBetaPlayer("WHITE", depth=2)
+    value = minimax.minimax(g, 2, True)[0]
+    assert(abs(alphabeta.search_root(g, 2)[0] - value) < 1e-9)
+    assert(len(g.history) == 2)
+
+
+def test_stalemate_same_as_minimax():
+    g = Game()
+    g.load_fen("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1")
+    minimax = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0)
+    alphabeta = AlphaBetaPlayer("WHITE", depth=2)
+    assert(minimax.minimax(g, 2, False)[0] == 0.)
+    assert(alphabeta.alphabeta(g, 2, -1000., 1000.) == 0.)
+    ## so when ahead, don't stalemate the other side
+    g.load_fen("k7/8/1K6/8/8/8/8/2Q5 w - - 0 1")
+    assert(minimax.choose_move(g) != (("C",1),("C",7)))
+    assert(alphabeta.choose_move(g) != (("C",1),("C",7)))
+
+
+def test_every_move_mated():
+    ## all of white's moves lose to mate, but it must still pick one
+    g = Game()
+    g.load_fen("8/6rN/5B2/3q4/8/1k6/6PP/7K w - - 0 1")
+    minimax = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0)
+    alphabeta = AlphaBetaPlayer("WHITE", depth=2)
+    assert(minimax.minimax(g, 2, True)[0] == -1000.)
+    assert(minimax.choose_move(g) in g.get_all_possible_moves("WHITE"))
+    assert(alphabeta.choose_move(g) in g.get_all_possible_moves("WHITE"))
+
+
+def test_mate_in_one():
+    g = Game()
+    g.clear()
+    g.add_piece(King("BLACK"),("H",8))
+    g.add_piece(Pawn("BLACK"),("G",7))
+    g.add_piece(Pawn("BLACK"),("H",7))
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Rook("WHITE"),("E",1))
+    g.update_all_pieces()
+    player = AlphaBetaPlayer("WHITE", depth=2)
+    assert(player.choose_move(g) == (("E",1),("E",8)))
+
+
+def test_move_ordering():
+    g = Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(King("BLACK"),("H",8))
+    g.add_piece(Queen("WHITE"),("D",1))
+    g.add_piece(Knight("WHITE"),("C",3))
+    g.add_piece(Rook("BLACK"),("D",5))
+    g.add_piece(Pawn("BLACK"),("B",5))
+    g.update_all_pieces()
+    player = AlphaBetaPlayer("WHITE")
+    moves = player.order_moves(g, g.get_all_possible_moves("WHITE",
+                                                           encoded=True))
+    ## knight takes rook, then queen takes rook, then knight takes pawn
+    assert(decode_move(moves[0]) == (("C",3),("D",5)))
+    assert(decode_move(moves[1]) == (("D",1),("D",5)))
+    assert(decode_move(moves[2]) == (("C",3),("B",5)))
+    assert(gives_check(g, (("D",1),("H",5))))
+    assert(not gives_check(g, (("D",1),("D",2))))
+
+
+def test_iterative_deepening_node_limit():
+    g = Game()
+    player = AlphaBetaPlayer("WHITE", depth=10, node_limit=200)
+    start, end = player.choose_move(g)
+    assert((start, end) in g.get_all_possible_moves("WHITE"))
+    assert(player.completed_depth >= 1)
+    assert(player.completed_depth < 10)
+    ## board should be back as it was
+    assert(len(g.undo_stack) == 0)
+    assert(len(g.history) == 0)
+    assert(g.next_to_play == "WHITE")
+    assert(len(g.board.pieces) == 32)
+
+
+def test_iterative_deepening_time_limit():
+    import time
+    g = Game()
+    player = AlphaBetaPlayer("WHITE", depth=10, time_limit=0.5)
+    t0 = time.perf_counter()
+    move = player.choose_move(g)
+    assert(time.perf_counter() - t0 < 2.)
+    assert(move in g.get_all_possible_moves("WHITE"))
+    assert(g.board.zobrist_key == g.board.compute_zobrist_key())
+
+
+def test_killer_moves():
+    g = Game()
+    player = AlphaBetaPlayer("WHITE")
+    g1f3, b1c3 = str_to_move("G1F3"), str_to_move("B1C3")
+    player.record_cutoff(g1f3, 2, 3)
+    player.record_cutoff(b1c3, 2, 3)
+    player.record_cutoff(g1f3, 1, 3)
+    assert(player.killers[3] == [b1c3, g1f3])
+    assert(player.history_scores[g1f3] == 5)
+    moves = g.get_all_possible_moves("WHITE", encoded=True)
+    assert(player.order_moves(g, moves, ply=3)[:2] == [b1c3, g1f3])
+    ## at other plies, only the history counts
+    assert(player.order_moves(g, moves, ply=2)[:2] == [g1f3, b1c3])
+
+
+def test_heuristics_kept_for_game():
+    g = Game()
+    player = AlphaBetaPlayer("WHITE", depth=3)
+    player.choose_move(g)
+    assert(len(player.killers) > 0)
+    history = dict(player.history_scores)
+    player.choose_move(g)
+    assert(len(player.history_scores) >= len(history) // 2)
+    ## a new game starts again from nothing
+    player.record_cutoff(str_to_move("A2A3"), 10, 1)
+    player.choose_move(Game())
+    assert(player.history_scores.get(str_to_move("A2A3"), 0) < 100)
+
+
+class NoHeuristicsPlayer(AlphaBetaPlayer):
+    def record_cutoff(self, move, depth, ply):
+        pass
+
+
+def test_heuristics_save_nodes():
+    g = Game()
+    g.load_fen("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1")
+    with_heuristics = AlphaBetaPlayer("WHITE", depth=4)
+    without = NoHeuristicsPlayer("WHITE", depth=4)
+    assert(with_heuristics.choose_move(g) == without.choose_move(g))
+    assert(with_heuristics.nodes < without.nodes)
+
+
+def test_selective_search_switches():
+    counts = {}
+    for null_move, reductions in [(False, False), (True, False),
+                                  (False, True)]:
+        g = Game()
+        g.move(("E",2),("E",4))
+        player = AlphaBetaPlayer("BLACK", depth=4, null_move=null_move,
+                                 late_move_reductions=reductions)
+        player.choose_move(g)
+        counts[(null_move, reductions)] = player.stats
+        assert(g.board.zobrist_key == g.board.compute_zobrist_key())
+        assert(g.next_to_play == "BLACK")
+    assert(counts[(False, False)]["null_move_searches"] == 0)
+    assert(counts[(False, False)]["reductions"] == 0)
+    assert(counts[(True, False)]["null_move_searches"] > 0)
+    assert(counts[(True, False)]["reductions"] == 0)
+    assert(counts[(False, True)]["reductions"] > 0)
+    assert(counts[(False, True)]["null_move_searches"] == 0)
+
+
+def test_no_null_move_with_only_pawns():
+    g = Game()
+    g.load_fen("8/5k2/5p2/8/3P4/3K4/8/8 w - - 0 1")
+    player = AlphaBetaPlayer("WHITE", depth=4)
+    player.choose_move(g)
+    assert(player.stats["null_move_searches"] == 0)
+    assert(not player.has_pieces(g, "WHITE"))
+
+
+def test_no_null_move_in_check():
+    ## at depth 3 only the root is deep enough for a null move
+    g = Game()
+    g.load_fen("4k3/8/8/8/8/8/3PPP2/3QK2r w - - 0 1")
+    player = AlphaBetaPlayer("WHITE")
+    player.alphabeta(g, 3, -1000., 1000.)
+    assert(player.stats["null_move_searches"] == 0)
+    g.load_fen("4k3/8/8/8/8/7r/3PPP2/3QK3 w - - 0 1")
+    player.alphabeta(g, 3, -1000., 1000.)
+    assert(player.stats["null_move_searches"] == 1)
+
+
+def test_selective_search_finds_mate():
+    g = Game()
+    g.load_fen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+    player = AlphaBetaPlayer("WHITE", depth=4)
+    assert(player.choose_move(g) == (("A",1),("A",8)))
+
+
+def play_line(g, moves):
+    for start, end in moves:
+        assert((start, end) in g.get_all_possible_moves(g.next_to_play))
+        g.move(start, end)
+
+
+def test_principal_variation():
+    g = Game()
+    g.move(("E",2),("E",4))
+    player = AlphaBetaPlayer("BLACK", depth=4)
+    move = player.choose_move(g)
+    assert(player.principal_variation[0] == move)
+    assert(len(player.principal_variation) == 4)
+    play_line(g, player.principal_variation)
+
+
+def test_minimax_principal_variation():
+    g = Game()
+    player = MinimaxPlayer("WHITE", depth=2)
+    move = player.choose_move(g)
+    assert(player.principal_variation[0] == move)
+    assert(len(player.principal_variation) == 2)
+    play_line(g, player.principal_variation)
+
+
+def test_pvs_and_aspiration_same_move():
+    fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    moves = []
+    for pvs, window in [(False, 0), (True, 0), (True, 0.01)]:
+        g = Game()
+        g.load_fen(fen)
+        player = AlphaBetaPlayer("WHITE", depth=3, pvs=pvs,
+                                 aspiration_window=window)
+        moves.append(player.choose_move(g))
+        if window:
+            ## a window this narrow has to be widened
+            assert(player.stats["aspiration_re_searches"] > 0)
+        else:
+            assert(player.stats["aspiration_re_searches"] == 0)
+    assert(moves[0] == moves[1] == moves[2])
+
+
+def test_aspiration_window_widens():
+    g = Game()
+    g.load_fen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+    player = AlphaBetaPlayer("WHITE", depth=2)
+    value, move = player.search_aspiration(g, 2, 0.)
+    assert(decode_move(move) == (("A",1),("A",8)))
+    assert(value == player.search_root(g, 2)[0])
+    assert(player.stats["aspiration_re_searches"] > 0)
@@ -0,0 +1,38 @@
+"""
+Test the move chooser benchmark.
+"""
+
+from Benchmark import benchmark, run_benchmarks, takes_depth, move_str
+from MoveChooser import methods
+
+
+def test_takes_depth():
+    assert(takes_depth(methods["Minimax"]))
+    assert(takes_depth(methods["AlphaBeta"]))
+    assert(not takes_depth(methods["Random"]))
+
+
+def test_move_str():
+    assert(move_str((("E",2),("E",4))) == "E2E4")
+
+
+def test_benchmark_result():
+    result = benchmark("AlphaBeta", "mate_in_one", 2)
+    assert(result["move"] == "A1A8")
+    assert(result["principal_variation"] == ["A1A8"])
+    assert(result["nodes"] > 0)
+    assert(result["nps"] > 0)
+    assert(result["peak_memory_bytes"] > 0)
+    assert("null_move_cutoffs" in result["stats"])
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(players=["Random", "Minimax"],
+                             positions=["endgame"], depths=[1, 2],
+                             measure_memory=False, verbose=False)
+    ## Random doesn't take a depth, so only runs once
+    assert(len(results) == 3)
+    assert(results[0]["depth"] is None)
+    assert(results[0]["nodes"] is None)
+    assert([r["depth"] for r in results[1:]] == [1, 2])
+    assert(results[2]["peak_memory_bytes"] is None)
@@ -0,0 +1,81 @@
+"""
+Test that the bitboard engine finds the same moves as the pieces do.
+"""
+
+import pytest
+import random
+
+from Chess import Game
+from Bitboard import SQUARES, square_index, bit_squares, KNIGHT_ATTACKS
+
+
+def piece_moves(game):
+    return { (p.current_position,
+              tuple(sorted(p.available_moves)),
+              tuple(sorted(p.threatens))) for p in game.board.pieces }
+
+
+def test_square_index():
+    assert(square_index(("A",1))==0)
+    assert(square_index(("H",8))==63)
+    assert(SQUARES[square_index(("E",4))]==("E",4))
+
+
+def test_knight_table():
+    corner = [SQUARES[s] for s in bit_squares(KNIGHT_ATTACKS[0])]
+    assert(sorted(corner) == [("B",3),("C",2)])
+
+
+def test_initial_moves():
+    g = Game()
+    gb = Game(engine="bitboard")
+    assert(piece_moves(g) == piece_moves(gb))
+    assert(len(gb.get_all_possible_moves("WHITE")) == 20)
+
+
+def test_unknown_engine():
+    with pytest.raises(RuntimeError):
+        Game(engine="abacus")
+
+
+def test_random_game():
+    """
+    Play the same random moves with both engines, and check they
+    always agree.
+    """
+    random.seed(42)
+    g = Game()
+    gb = Game(engine="bitboard")
+    for i in range(30):
+        assert(piece_moves(g) == piece_moves(gb))
+        moves = g.get_all_possible_moves(g.next_to_play)
+        assert(sorted(moves) ==
+               sorted(gb.get_all_possible_moves(gb.next_to_play)))
+        if len(moves) == 0:
+            break
+        move = random.choice(moves)
+        g.move(move[0], move[1])
+        gb.move(move[0], move[1])
+
+
+def test_board_bitboards_follow_moves():
+    """
+    The board's bitboards should match its pieces after moves
+    are made and unmade.
+    """
+    random.seed(7)
+    gb = Game(engine="bitboard")
+    for i in range(20):
+        moves = gb.get_all_possible_moves(gb.next_to_play)
+        if len(moves) == 0:
+            break
+        gb.make_move(*random.choice(moves))
+        if i % 3 == 2:
+            gb.unmake_move()
+        for colour, bitboards in gb.board.bitboards.items():
+            for piece_type, mask in bitboards.items():
+                positions = [p.current_position for p in gb.board.pieces
+                             if p.colour == colour and
+                             p.piece_type == piece_type]
+                assert(sorted(SQUARES[s] for s in bit_squares(mask)) ==
+                       sorted(positions))
@@ -41,3 +41,83 @@ def test_snapshot():
     b.load_snapshot()
     assert(b.is_empty(("F",1)))
     assert(not b.is_empty(("E",1)))
+
+
+def test_square_index():
+    """
+    The square index should follow pieces as they are added,
+    moved, taken, and when a snapshot is loaded.
+    """
+    b = Board()
+    k = King("WHITE")
+    k.current_position = ("E",1)
+    b.pieces.append(k)
+    assert(b.squares[("E",1)] is k)
+    b.save_snapshot()
+    k.set_position(("F",2))
+    assert(("E",1) not in b.squares)
+    assert(b.piece_at(("F",2)) is k)
+    b.pieces.remove(k)
+    assert(b.is_empty(("F",2)))
+    b.load_snapshot()
+    assert(b.piece_at(("E",1)).piece_type == "King")
+    assert(len(b.squares) == 1)
+
+
+def test_square_index_game():
+    from Chess import Game
+    g = Game()
+    assert(len(g.board.squares) == 32)
+    g.move(("B",1),("C",3))
+    g.move(("D",7),("D",5))
+    g.move(("C",3),("D",5))
+    assert(len(g.board.squares) == 31)
+    for p in g.board.pieces:
+        assert(g.board.squares[p.current_position] is p)
+
+
+def test_zobrist_key():
+    from Chess import Game
+    g = Game()
+    start_key = g.board.zobrist_key
+    assert(start_key == g.board.compute_zobrist_key())
+    assert(len(g.board.castling_rights) == 4)
+    g.move(("G",1),("F",3))
+    assert(g.board.zobrist_key == g.board.compute_zobrist_key())
+    assert(g.board.zobrist_key != start_key)
+    g.move(("G",8),("F",6))
+    g.move(("F",3),("G",1))
+    g.move(("F",6),("G",8))
+    ## same pieces and same side to move, so same key
+    assert(g.board.zobrist_key == start_key)
+    g.next_player_turn()
+    assert(g.board.zobrist_key != start_key)
+    assert(g.board.zobrist_key == g.board.compute_zobrist_key())
+
+
+def test_zobrist_transposition():
+    from Chess import Game
+    g1 = Game()
+    g2 = Game()
+    for m in [(("E",2),("E",4)),(("E",7),("E",5)),(("G",1),("F",3))]:
+        g1.move(m[0],m[1])
+    for m in [(("G",1),("F",3)),(("E",7),("E",5)),(("E",2),("E",4))]:
+        g2.move(m[0],m[1])
+    assert(g1.board.zobrist_key == g2.board.zobrist_key)
+
+
+def test_zobrist_castling_rights():
+    from Chess import Game
+    g = Game()
+    for m in [(("H",2),("H",4)),(("A",7),("A",5)),
+              (("H",1),("H",3)),(("A",5),("A",4)),
+              (("H",3),("H",1))]:
+        g.move(m[0],m[1])
+    ## rook is back where it started, but white can't castle king-side
+    assert(("WHITE","G") not in g.board.castling_rights)
+    assert(g.board.zobrist_key == g.board.compute_zobrist_key())
+    g.make_move(("A",8),("A",5))
+    assert(("BLACK","C") not in g.board.castling_rights)
+    g.unmake_move()
+    assert(("BLACK","C") in g.board.castling_rights)
+    assert(g.board.zobrist_key == g.board.compute_zobrist_key())
@@ -0,0 +1,89 @@
+"""
+Test the NumPy piece-square table evaluator (skipped if numpy
+isn't installed).
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Chess import Game
+from Pieces import King, Rook, Pawn
+from Evaluator import NumpyEvaluator, PLANES, \
+    ENCODING_SIZE, encoding_indices, table_index
+from MoveChooser import MinimaxPlayer
+
+
+def test_encode_start():
+    g = Game()
+    encoded = NumpyEvaluator().encode(g.board)
+    assert(encoded.shape == (ENCODING_SIZE,))
+    assert(encoded.sum() == 32)
+    ## white king on E1 (square 4)
+    assert(encoded[PLANES[("WHITE","King")] * 64 + 4] == 1)
+
+
+def test_start_is_level():
+    g = Game()
+    assert(abs(NumpyEvaluator().score(g.board)) < 1e-9)
+
+
+def test_piece_square_table():
+    ## WHITE pawn on E4 is worth more than on E2, and the same
+    ## as a BLACK pawn on E5 is for BLACK
+    assert(table_index("WHITE", 28) == table_index("BLACK", 36))
+    g = Game()
+    evaluator = NumpyEvaluator()
+    g.move(("E",2),("E",4))
+    assert(evaluator.score(g.board) == pytest.approx(0.4))
+    g.move(("E",7),("E",5))
+    assert(evaluator.score(g.board) == pytest.approx(0.))
+
+
+def test_batch_matches_single():
+    g = Game()
+    evaluator = NumpyEvaluator()
+    indices = []
+    singles = []
+    for move in g.get_all_possible_moves("WHITE"):
+        g.make_move(*move)
+        indices.append(encoding_indices(g.board))
+        singles.append(evaluator.score(g.board))
+        g.unmake_move()
+    batch = evaluator.score_batch(evaluator.encode_batch(indices))
+    assert(batch.shape == (20,))
+    assert(np.allclose(batch, singles))
+
+
+def test_minimax_batched():
+    g = Game()
+    g.clear()
+    g.add_piece(King("BLACK"),("H",8))
+    g.add_piece(Pawn("BLACK"),("G",7))
+    g.add_piece(Pawn("BLACK"),("H",7))
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Rook("WHITE"),("D",1))
+    g.update_all_pieces()
+    player = MinimaxPlayer("WHITE", depth=1, evaluator="numpy")
+    assert(player.choose_move(g) == (("D",1),("D",8)))
+    assert(player.nodes == 1 + len(g.get_all_possible_moves("WHITE")))
+
+
+def test_minimax_same_scores():
+    g = Game()
+    g.move(("E",2),("E",4))
+    player = MinimaxPlayer("BLACK", depth=2, tt_size_mb=0,
+                           evaluator="numpy")
+    value = player.minimax(g, 2, True)[0]
+    ## the same search, scoring the final positions one at a time
+    best = -999.
+    for move in g.get_all_possible_moves("BLACK"):
+        g.make_move(*move)
+        worst = 999.
+        for reply in g.get_all_possible_moves("WHITE"):
+            g.make_move(*reply)
+            worst = min(worst, player.get_points_for_position(g))
+            g.unmake_move()
+        g.unmake_move()
+        best = max(best, worst)
+    assert(value == pytest.approx(best))
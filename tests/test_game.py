@@ -4,7 +4,7 @@ Test that the Game class works as expected
 
 import pytest
 from Chess import Game
-from Pieces import King, Queen, Rook, Pawn
+from Pieces import King, Queen, Rook, Pawn, Knight
 
 def test_initial_setup():
     g = Game()
@@ -140,6 +140,21 @@ def test_cant_castle_after_moving():
     assert(not g.is_legal_move("BLACK",("E",8),("G",8)))
 
 
+@pytest.mark.parametrize("engine", ["pieces", "bitboard"])
+def test_cant_castle_through_piece(engine):
+    ## a piece on B1/B8 blocks castling queen side, even though
+    ## the king doesn't pass over it
+    g=Game(engine=engine)
+    g.load_fen("r3k2r/8/8/8/8/8/8/RN2K2R w KQkq - 0 1")
+    moves = g.get_all_possible_moves("WHITE")
+    assert((("E",1),("C",1)) not in moves)
+    assert((("E",1),("G",1)) in moves)
+    g.load_fen("rn2k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1")
+    moves = g.get_all_possible_moves("BLACK")
+    assert((("E",8),("C",8)) not in moves)
+    assert((("E",8),("G",8)) in moves)
+
+
 def test_promotion():
     g=Game()
     g.clear()
@@ -155,3 +170,223 @@ def test_promotion():
     assert(g.is_legal_move("BLACK",("G",2),("G",1)))
     g.move(("G",2),("G",1))
     assert(g.board.piece_at(("G",1)).piece_type=="Queen")
+
+
+def board_state(g):
+    return [(p.colour, p.piece_type, p.current_position, p.has_moved,
+             sorted(p.available_moves), sorted(p.threatens))
+            for p in g.board.pieces]
+
+
+def test_make_unmake_castle():
+    g=Game()
+    for m in [(("G",1),("H",3)),(("G",8),("H",6)),
+              (("E",2),("D",3)),(("E",7),("D",6)),
+              (("F",1),("E",2)),(("F",8),("E",7))]:
+        g.move(m[0],m[1])
+    before = board_state(g)
+    g.make_move(("E",1),("G",1))
+    assert(g.board.piece_at(("F",1)).piece_type=="Rook")
+    assert(g.next_to_play=="BLACK")
+    g.unmake_move()
+    assert(board_state(g)==before)
+    assert(g.board.piece_at(("H",1)).has_moved==False)
+    assert(g.next_to_play=="WHITE")
+    assert(len(g.history)==6)
+
+
+def test_make_unmake_promotion_take():
+    g=Game()
+    g.clear()
+    g.add_piece(Pawn("WHITE"),("B",7))
+    g.add_piece(King("WHITE"),("E",1))
+    g.add_piece(Rook("BLACK"),("C",8))
+    g.add_piece(King("BLACK"),("G",7))
+    g.update_all_pieces()
+    before = board_state(g)
+    g.make_move(("B",7),("C",8))
+    assert(len(g.board.pieces)==3)
+    assert(g.board.piece_at(("C",8)).piece_type=="Queen")
+    g.unmake_move()
+    assert(board_state(g)==before)
+    assert(g.board.piece_at(("C",8)).piece_type=="Rook")
+    assert(g.board.piece_at(("B",7)).piece_type=="Pawn")
+
+
+def test_make_unmake_null_move():
+    g=Game()
+    g.move(("E",2),("E",4))
+    before = board_state(g)
+    key = g.board.zobrist_key
+    g.make_null_move()
+    assert(g.next_to_play=="WHITE")
+    assert(g.board.zobrist_key != key)
+    assert(g.board.zobrist_key == g.board.compute_zobrist_key())
+    g.unmake_move()
+    assert(g.next_to_play=="BLACK")
+    assert(g.board.zobrist_key == key)
+    assert(board_state(g)==before)
+    assert(len(g.history)==1)
+
+
+def test_make_unmake_every_move():
+    """
+    Making then unmaking any move should leave the position unchanged.
+    """
+    g=Game()
+    for m in [(("E",2),("E",4)),(("D",7),("D",5)),(("E",4),("D",5))]:
+        g.move(m[0],m[1])
+    before = board_state(g)
+    for colour in ["BLACK","WHITE"]:
+        for p in list(g.board.pieces):
+            if p.colour != colour:
+                continue
+            for end_pos in list(p.available_moves):
+                g.make_move(p.current_position, end_pos)
+                g.unmake_move()
+                assert(board_state(g)==before)
+
+
+@pytest.mark.parametrize("engine", ["pieces", "bitboard"])
+def test_unmake_restores_updated_pieces(engine):
+    """
+    The undo record only holds the pieces whose moves were worked
+    out again, and taking back a line of moves puts every piece
+    (and the evaluation totals) back as they were.
+    """
+    g=Game(engine=engine)
+    g.update_all_pieces()
+    before = board_state(g)
+    terms = [p.eval_terms for p in g.board.pieces]
+    totals = g.board.save_eval_totals()
+    line = [(("G",1),("F",3)),(("E",7),("E",5)),(("F",3),("E",5)),
+            (("D",8),("G",5)),(("E",5),("F",7))]
+    for m in line:
+        g.make_move(m[0],m[1])
+    assert(len(g.undo_stack[0]["piece_state"]) < len(g.board.pieces))
+    for m in line:
+        g.unmake_move()
+    assert(board_state(g)==before)
+    assert([p.eval_terms for p in g.board.pieces]==terms)
+    assert(g.board.eval_totals==totals)
+
+
+def test_incremental_update():
+    """
+    Updating only the affected pieces after each move should give
+    the same result as updating everything.
+    """
+    g=Game()
+    g_full=Game(incremental=False)
+    moves = [(("E",2),("E",4)),(("D",7),("D",5)),(("E",4),("D",5)),
+             (("D",8),("D",5)),(("B",1),("C",3)),(("D",5),("A",5)),
+             (("F",1),("B",5)),(("C",7),("C",6)),(("G",1),("F",3)),
+             (("C",6),("B",5)),(("E",1),("G",1))]
+    for m in moves:
+        g.move(m[0],m[1])
+        g_full.move(m[0],m[1])
+        assert(board_state(g)==board_state(g_full))
+
+
+def test_pinned_piece():
+    g=Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("E",1))
+    g.add_piece(Rook("WHITE"),("E",3))
+    g.add_piece(Rook("BLACK"),("E",8))
+    g.add_piece(King("BLACK"),("A",8))
+    g.update_all_pieces()
+    checks, pins = g.find_checks_and_pins("WHITE")
+    assert(len(checks)==0)
+    assert(len(pins)==1)
+    moves = g.get_all_possible_moves("WHITE")
+    rook_moves = [m[1] for m in moves if m[0]==("E",3)]
+    ## pinned rook can only move along the file
+    assert(sorted(rook_moves)==[("E",2),("E",4),("E",5),("E",6),
+                                ("E",7),("E",8)])
+    assert(not g.is_legal_move("WHITE",("E",3),("D",3)))
+
+
+def test_check_evasions():
+    g=Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("E",1))
+    g.add_piece(Rook("WHITE"),("A",2))
+    g.add_piece(Queen("WHITE"),("H",4))
+    g.add_piece(Rook("BLACK"),("E",8))
+    g.add_piece(King("BLACK"),("A",8))
+    g.update_all_pieces()
+    moves = g.get_all_possible_moves("WHITE")
+    ## block with rook or queen, take with queen, or move the king
+    ## off the file (but not back along it)
+    assert((("A",2),("E",2)) in moves)
+    assert((("H",4),("E",4)) in moves)
+    assert((("H",4),("E",7)) in moves)
+    assert((("E",1),("D",1)) in moves)
+    assert((("A",2),("A",3)) not in moves)
+    assert((("E",1),("E",2)) not in moves)
+    ## double check - only the king can move
+    g.add_piece(Knight("BLACK"),("D",3))
+    g.update_all_pieces()
+    moves = g.get_all_possible_moves("WHITE")
+    assert(len(moves)>0)
+    for m in moves:
+        assert(m[0]==("E",1))
+
+
+def test_square_attacked():
+    g=Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("E",1))
+    g.add_piece(Rook("BLACK"),("E",8))
+    g.add_piece(Pawn("BLACK"),("C",4))
+    g.add_piece(Knight("BLACK"),("G",5))
+    g.add_piece(King("BLACK"),("A",8))
+    ## no need to update the pieces first
+    assert(g.is_check("WHITE"))
+    assert(not g.is_check("BLACK"))
+    assert(g.is_square_attacked(("D",3),"BLACK"))
+    assert(g.is_square_attacked(("F",3),"BLACK"))
+    assert(g.is_square_attacked(("B",7),"BLACK"))
+    assert(not g.is_square_attacked(("D",4),"BLACK"))
+    ## blocking the rook's line stops the check, unless we look through
+    ## the blocking piece
+    g.add_piece(Rook("WHITE"),("E",2))
+    assert(not g.is_check("WHITE"))
+    assert(g.is_square_attacked(("E",1),"BLACK",
+                                g.board.occupied & ~(1 << 12)))
+    assert(g.board.king_position("WHITE")==("E",1))
+
+
+def test_legal_moves_cached():
+    g=Game()
+    moves = g.get_all_possible_moves("WHITE")
+    assert(len(moves)==20)
+    assert((g.board.zobrist_key,"WHITE") in g.legal_moves_cache)
+    ## changing the returned list doesn't change the cache
+    moves.pop()
+    assert(len(g.get_all_possible_moves("WHITE"))==20)
+    assert(not g.is_checkmate("WHITE"))
+    assert(not g.is_stalemate("WHITE"))
+    assert(len(g.legal_moves_cache)==1)
+    ## moving a piece by hand means the moves get worked out again
+    g.board.piece_at(("G",1)).set_position(("F",3))
+    moves = g.get_all_possible_moves("WHITE")
+    assert((("G",2),("G",4)) in moves)
+    assert((("F",3),("G",1)) in moves)
+    assert((("F",2),("F",3)) not in moves)
+    assert((("F",2),("F",4)) not in moves)
+
+
+def test_kings_see_each_other():
+    """
+    A king's moves shouldn't depend on the order the kings are updated.
+    """
+    g=Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("F",5))
+    g.add_piece(King("BLACK"),("D",7))
+    g.update_all_pieces()
+    g.next_player_turn()
+    g.move(("D",7),("E",8))
+    assert((("F",5),("E",6)) in g.get_all_possible_moves("WHITE"))
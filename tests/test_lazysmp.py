@@ -0,0 +1,78 @@
+"""
+Test the Lazy SMP parallel search player.
+"""
+
+from Chess import Game
+from Pieces import King, Rook, Pawn
+from Perft import SUITE
+import MoveChooser
+from MoveChooser import LazySMPPlayer, AlphaBetaPlayer, methods, \
+    attach_shared_table, search_shared
+from TranspositionTable import SharedTranspositionTable
+
+
+def mate_in_one():
+    g = Game()
+    g.clear()
+    g.add_piece(King("BLACK"),("H",8))
+    g.add_piece(Pawn("BLACK"),("G",7))
+    g.add_piece(Pawn("BLACK"),("H",7))
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Rook("WHITE"),("E",1))
+    g.update_all_pieces()
+    return g
+
+
+def test_in_methods():
+    assert(methods["LazySMP"] == LazySMPPlayer)
+
+
+def test_mate_in_one():
+    g = mate_in_one()
+    player = LazySMPPlayer("WHITE", depth=2, tt_size_mb=1, workers=2)
+    assert(player.choose_move(g) == (("E",1),("E",8)))
+    assert(player.completed_depth == 2)
+    assert(player.principal_variation == [(("E",1),("E",8))])
+    assert(player.nodes > 0)
+
+
+def test_same_move_as_alphabeta():
+    g = Game()
+    g.load_fen(SUITE["position3"][0])
+    alphabeta = AlphaBetaPlayer("WHITE", depth=3)
+    lazy = LazySMPPlayer("WHITE", depth=3, tt_size_mb=1, workers=3)
+    assert(lazy.choose_move(g) == alphabeta.choose_move(g))
+    assert(g.get_fen() == SUITE["position3"][0])
+
+
+def test_time_limit():
+    g = Game()
+    player = LazySMPPlayer("WHITE", depth=20, tt_size_mb=1,
+                           time_limit=0.5, workers=2)
+    move = player.choose_move(g)
+    assert(move in g.get_all_possible_moves("WHITE"))
+    assert(player.completed_depth < 20)
+
+
+def test_alphabeta_settings_inherited():
+    player = LazySMPPlayer("WHITE", depth=2, tt_size_mb=1, workers=2)
+    assert(player.tt is None)
+    assert(player.tt_size_mb == 1)
+    assert(player.workers == 2)
+    assert(player.stats["null_move_searches"] == 0)
+    assert(player.killers == {} and player.pv_table == {})
+
+
+def test_search_shared_ages_entries():
+    g = mate_in_one()
+    table = SharedTranspositionTable(1)
+    try:
+        attach_shared_table(1, table.name)
+        depth, score, move, nodes, pv = search_shared(
+            (g.get_fen(), [], 2, 7, None, None, "pieces", 4))
+        entry = table.probe(g.board.zobrist_key)
+        assert(entry[1] == 2 and entry[5] == 7)
+    finally:
+        MoveChooser._shared_table.close()
+        MoveChooser._shared_table = None
+        table.close(unlink=True)
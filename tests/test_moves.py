@@ -0,0 +1,80 @@
+"""
+Test the integer encoding of moves.
+"""
+
+from Chess import Game
+from Moves import NO_MOVE, CAPTURE, PROMOTION, CASTLE, encode_move, \
+    decode_move, move_to_str, str_to_move
+
+
+def test_round_trip():
+    move = encode_move(("E",2),("E",4))
+    assert(0 < move < 2**16)
+    assert(decode_move(move) == (("E",2),("E",4)))
+    assert(move_to_str(move) == "E2E4")
+    assert(str_to_move("E2E4") == move)
+    assert(str_to_move("h7h8") == encode_move(("H",7),("H",8)))
+
+
+def test_flags():
+    move = encode_move(("B",7),("A",8), CAPTURE | PROMOTION)
+    assert(move < 2**16)
+    assert(move & CAPTURE and move & PROMOTION and not move & CASTLE)
+    assert(decode_move(move) == (("B",7),("A",8)))
+    assert(move_to_str(move) == "B7A8")
+    assert(move != NO_MOVE)
+
+
+def test_decoded_moves_shared():
+    assert(decode_move(str_to_move("E2E4")) is
+           decode_move(str_to_move("E2E4") | CAPTURE))
+
+
+def test_game_encoded_moves():
+    g = Game()
+    g.load_fen("r3k3/1P6/8/8/8/8/8/4K2R w K - 0 1")
+    moves = g.get_all_possible_moves("WHITE")
+    encoded = g.get_all_possible_moves("WHITE", encoded=True)
+    assert([decode_move(m) for m in encoded] == moves)
+    flags = {move_to_str(m): m & (CAPTURE | PROMOTION | CASTLE)
+             for m in encoded}
+    assert(flags["E1G1"] == CASTLE)
+    assert(flags["B7A8"] == CAPTURE | PROMOTION)
+    assert(flags["B7B8"] == PROMOTION)
+    assert(flags["H1H8"] == 0)
+    captures = g.get_capture_moves("WHITE", encoded=True)
+    assert(sorted(move_to_str(m) for m in captures) == ["B7A8", "B7B8"])
+
+
+def test_make_encoded_move():
+    g = Game()
+    g.make_encoded_move(g.encode_move(("E",2),("E",4)))
+    assert(g.board.piece_at(("E",4)).piece_type == "Pawn")
+    assert(g.next_to_play == "BLACK")
+    g.unmake_move()
+    assert(g.board.piece_at(("E",2)).piece_type == "Pawn")
+
+
+def test_encoded_same_as_encode_move():
+    """
+    Moves encoded while they are generated should be the same
+    as encoding each (start_pos, end_pos) tuple afterwards, in
+    and out of check.
+    """
+    g = Game()
+    for fen in ["r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R "
+                "w KQkq - 0 1",
+                "4k3/8/8/8/1b6/8/8/1N2K3 w - - 0 1"]:
+        g.load_fen(fen)
+        moves = g.get_all_possible_moves("WHITE")
+        encoded = g.get_all_possible_moves("WHITE", encoded=True)
+        assert(encoded == [g.encode_move(*m) for m in moves])
+
+
+def test_encoded_move_history():
+    g = Game()
+    g.make_encoded_move(g.encode_move(("E",2),("E",4)))
+    g.make_move(("E",7),("E",5))
+    assert(g.history[0] == str_to_move("E2E4"))
+    assert(g.get_history() == [(("E",2),("E",4)), (("E",7),("E",5))])
+    assert(g.get_history_str() == "E2E4E7E5")
@@ -0,0 +1,41 @@
+"""
+Test the parallel root search of the minimax player.
+"""
+
+from Chess import Game
+from Perft import SUITE
+from MoveChooser import MinimaxPlayer, search_root_move, rebuild_game
+
+
+def test_search_root_move():
+    ## set up the same way as in the worker, so the pieces (and
+    ## so the moves) come in the same order
+    g = rebuild_game(Game().get_fen(), [])
+    player = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0)
+    move = g.encode_move(("E",2),("E",4))
+    g.make_encoded_move(move)
+    value = player.minimax(g, 1, False, ply=1)[0]
+    nodes = player.nodes
+    result = search_root_move((Game().get_fen(), [], move, "WHITE", 2,
+                               0, "pieces", player.quiescence_depth))
+    assert(result == (value, nodes))
+
+
+def test_parallel_same_as_serial():
+    g = Game()
+    g.load_fen(SUITE["position3"][0])
+    serial = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0)
+    parallel = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0, workers=2)
+    move = serial.choose_move(g)
+    assert(parallel.choose_move(g) == move)
+    assert(parallel.nodes == serial.nodes)
+    ## the game itself is left alone
+    assert(g.get_fen() == SUITE["position3"][0])
+    assert(len(g.undo_stack) == 0)
+
+
+def test_parallel_every_move_mated():
+    g = Game()
+    g.load_fen("8/6rN/5B2/3q4/8/1k6/6PP/7K w - - 0 1")
+    parallel = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0, workers=2)
+    assert(parallel.choose_move(g) in g.get_all_possible_moves("WHITE"))
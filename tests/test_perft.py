@@ -0,0 +1,78 @@
+"""
+Test FEN loading and the perft node counts.
+"""
+
+import pytest
+
+from Chess import Game, START_FEN
+from Perft import perft, divide, run_perft, PerftStats, SUITE
+
+
+def test_fen_round_trip():
+    g = Game()
+    assert(g.get_fen() == START_FEN)
+    fen = SUITE["kiwipete"][0]
+    g.load_fen(fen)
+    assert(g.get_fen() == fen)
+    assert(("WHITE","G") in g.board.castling_rights)
+
+
+def test_fen_side_to_move():
+    g = Game()
+    g.load_fen("8/8/8/8/8/8/8/K6k b - - 0 1")
+    assert(g.next_to_play == "BLACK")
+    assert(len(g.board.pieces) == 2)
+    assert(not g.board.castling_rights)
+
+
+@pytest.mark.parametrize("engine", ["pieces", "bitboard"])
+def test_start_position(engine):
+    g = Game(engine=engine)
+    assert(perft(g, 1) == 20)
+    assert(perft(g, 2) == 400)
+    assert(len(g.history) == 0)
+
+
+def test_start_position_stats():
+    g = Game()
+    stats = PerftStats()
+    assert(perft(g, 3, stats) == 8902)
+    assert(stats.nodes == 8902)
+    assert(stats.captures == 34)
+    assert(stats.checks == 12)
+    assert(stats.castles == 0)
+
+
+@pytest.mark.parametrize("engine", ["pieces", "bitboard"])
+def test_suite(engine):
+    for name, (fen, expected) in SUITE.items():
+        g = Game(engine=engine)
+        g.load_fen(fen)
+        for depth, count in enumerate(expected[:2]):
+            assert(perft(g, depth + 1) == count)
+
+
+@pytest.mark.parametrize("engine", ["pieces", "bitboard"])
+def test_kiwipete_depth_3(engine):
+    ## deep enough to catch castling through a piece on B1 (after
+    ## C3B1), which only shows up at depth 3
+    g = Game(engine=engine)
+    g.load_fen(SUITE["kiwipete"][0])
+    assert(perft(g, 3) == SUITE["kiwipete"][1][2] == 97766)
+    assert(g.get_fen() == SUITE["kiwipete"][0])
+
+
+def test_kiwipete_stats():
+    results = run_perft(SUITE["kiwipete"][0], 2, verbose=False)
+    assert(results[1]["nodes"] == 2038)
+    assert(results[1]["castles"] == 91)
+    assert(results[1]["checks"] == 3)
+    assert(results[1]["nps"] > 0)
+
+
+def test_divide():
+    g = Game()
+    counts = divide(g, 2)
+    assert(len(counts) == 20)
+    assert(counts["E2E4"] == 20)
+    assert(sum(counts.values()) == 400)
@@ -0,0 +1,115 @@
+"""
+Test the capture-only move generator and the quiescence search.
+"""
+
+from Chess import Game
+from Pieces import King, Queen, Rook, Pawn
+from MoveChooser import MinimaxPlayer, AlphaBetaPlayer, MATE_SCORE
+
+
+def queen_takes_defended_pawn():
+    g = Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Queen("WHITE"),("D",1))
+    g.add_piece(King("BLACK"),("H",8))
+    g.add_piece(Pawn("BLACK"),("D",5))
+    g.add_piece(Pawn("BLACK"),("E",6))
+    g.update_all_pieces()
+    return g
+
+
+def test_no_captures_at_start():
+    g = Game()
+    assert(g.get_capture_moves("WHITE") == [])
+
+
+def test_capture_moves():
+    g = queen_takes_defended_pawn()
+    assert(g.get_capture_moves("WHITE") == [(("D",1),("D",5))])
+    g.next_to_play = "BLACK"
+    assert(g.get_capture_moves("BLACK") == [])
+
+
+def test_promotion_counts_as_capture():
+    g = Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Pawn("WHITE"),("C",7))
+    g.add_piece(King("BLACK"),("H",5))
+    g.update_all_pieces()
+    assert(g.get_capture_moves("WHITE") == [(("C",7),("C",8))])
+
+
+def test_capture_moves_in_check():
+    g = Game()
+    g.clear()
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Rook("BLACK"),("A",8))
+    g.add_piece(King("BLACK"),("H",8))
+    g.update_all_pieces()
+    ## every way out of check, not just captures
+    assert(sorted(g.get_capture_moves("WHITE")) ==
+           sorted(g.get_all_possible_moves("WHITE")))
+    assert(len(g.get_capture_moves("WHITE")) == 2)
+
+
+def test_avoids_horizon_blunder():
+    g = queen_takes_defended_pawn()
+    no_quiescence = MinimaxPlayer("WHITE", depth=1, quiescence_depth=0)
+    assert(no_quiescence.choose_move(g) == (("D",1),("D",5)))
+    for player in [MinimaxPlayer("WHITE", depth=1),
+                   AlphaBetaPlayer("WHITE", depth=1)]:
+        assert(player.choose_move(g) != (("D",1),("D",5)))
+    assert(len(g.undo_stack) == 0)
+
+
+def test_stand_pat_and_delta_pruning():
+    g = queen_takes_defended_pawn()
+    player = MinimaxPlayer("WHITE", depth=1)
+    stand_pat = player.evaluate(g)
+    ## taking the pawn loses the queen, so standing pat is best
+    assert(player.quiescence(g, -2 * MATE_SCORE, 2 * MATE_SCORE) ==
+           stand_pat)
+    assert(player.nodes == 2)
+    ## already at least beta, so nothing is searched
+    player.nodes = 0
+    assert(player.quiescence(g, -2 * MATE_SCORE, stand_pat - 1) ==
+           stand_pat)
+    assert(player.nodes == 0)
+    ## even winning a free pawn couldn't get up to alpha
+    assert(player.quiescence(g, stand_pat + 5, stand_pat + 10) ==
+           stand_pat)
+    assert(player.nodes == 0)
+
+
+def test_mated_in_quiescence():
+    g = Game()
+    g.clear()
+    g.add_piece(King("BLACK"),("H",8))
+    g.add_piece(Pawn("BLACK"),("G",7))
+    g.add_piece(Pawn("BLACK"),("H",7))
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Rook("WHITE"),("D",8))
+    g.next_to_play = "BLACK"
+    g.update_all_pieces()
+    player = MinimaxPlayer("BLACK")
+    assert(player.quiescence(g, -2 * MATE_SCORE, 2 * MATE_SCORE) ==
+           -MATE_SCORE)
+
+
+def test_mate_found_without_is_checkmate():
+    ## the search finds checkmate from the positions with no legal
+    ## moves, without testing every leaf for it
+    g = Game()
+    g.load_fen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+    def no_checkmate_test(colour):
+        raise AssertionError("is_checkmate called")
+    g.is_checkmate = no_checkmate_test
+    for quiescence_depth in [0, 2]:
+        minimax = MinimaxPlayer("WHITE", depth=1, tt_size_mb=0,
+                                quiescence_depth=quiescence_depth)
+        assert(minimax.minimax(g, 1, True)[0] == MATE_SCORE)
+        alphabeta = AlphaBetaPlayer("WHITE", depth=1,
+                                    quiescence_depth=quiescence_depth)
+        assert(alphabeta.choose_move(g) == (("A",1),("A",8)))
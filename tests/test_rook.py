@@ -61,3 +61,21 @@ def test_rook_take():
     r2.find_available_moves(b)
     assert(len(r1.available_moves)==12)
     assert(len(r2.available_moves)==13)
+
+
+def test_rook_threatens_updated():
+    """
+    Threatened squares shouldn't go stale once a blocking
+    piece moves out of the way.
+    """
+    b = Board()
+    r1 = Rook("WHITE")
+    r1.set_position(("A",1))
+    r2 = Rook("WHITE")
+    r2.set_position(("A",2))
+    b.pieces += [r1,r2]
+    r1.find_positions_threatened(b)
+    assert(len(r1.threatens)==8)
+    r2.set_position(("H",2))
+    r1.find_positions_threatened(b)
+    assert(len(r1.threatens)==14)
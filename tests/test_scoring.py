@@ -5,7 +5,7 @@ Test that the points for individual moves are as expected
 import pytest
 from Chess import Game
 from Pieces import King, Queen, Rook, Pawn
-from MoveChooser import BestNextPointsPlayer
+from MoveChooser import BestNextPointsPlayer, MinimaxPlayer
 
 def test_points_take_pawn():
     g=Game()
@@ -42,3 +42,60 @@ def test_points_rook_threaten():
     player = BestNextPointsPlayer("BLACK")
     points = player.potential_points_for_move(g,"BLACK",(("B",8),("B",4)))
     assert(points==-5)
+
+
+def eval_totals_from_scratch(g):
+    totals = {"WHITE": [0, 0, 0, 0], "BLACK": [0, 0, 0, 0]}
+    for p in g.board.pieces:
+        for i, term in enumerate(p.find_eval_terms()):
+            totals[p.colour][i] += term
+    return totals
+
+
+def test_eval_totals_start():
+    g=Game()
+    totals = g.board.eval_totals
+    assert(totals["WHITE"][0] == 139)
+    assert(totals["WHITE"][1] == 20)
+    assert(totals == eval_totals_from_scratch(g))
+    player = MinimaxPlayer("WHITE")
+    assert(player.get_points_for_position(g) == 0.)
+
+
+def test_eval_totals_make_unmake():
+    g=Game()
+    for move in [(("E",2),("E",4)), (("D",7),("D",5)),
+                 (("E",4),("D",5)), (("D",8),("D",5))]:
+        g.make_move(*move)
+        assert(g.board.eval_totals == eval_totals_from_scratch(g))
+    assert(g.board.eval_totals["WHITE"][0] == 138)
+    assert(g.board.eval_totals["BLACK"][0] == 138)
+    for i in range(4):
+        g.unmake_move()
+        assert(g.board.eval_totals == eval_totals_from_scratch(g))
+    assert(g.board.eval_totals == eval_totals_from_scratch(Game()))
+
+
+@pytest.mark.parametrize("engine", ["pieces", "bitboard"])
+def test_eval_totals_every_move(engine):
+    g=Game(engine=engine)
+    g.make_move(("E",2),("E",4))
+    g.make_move(("E",7),("E",5))
+    for move in g.get_all_possible_moves("WHITE"):
+        g.make_move(*move)
+        assert(g.board.eval_totals == eval_totals_from_scratch(g))
+        g.unmake_move()
+
+
+def test_points_checkmate():
+    g=Game()
+    g.clear()
+    g.add_piece(King("BLACK"),("H",8))
+    g.add_piece(Pawn("BLACK"),("G",7))
+    g.add_piece(Pawn("BLACK"),("H",7))
+    g.add_piece(King("WHITE"),("A",1))
+    g.add_piece(Rook("WHITE"),("D",8))
+    g.next_to_play = "BLACK"
+    g.update_all_pieces()
+    assert(MinimaxPlayer("WHITE").get_points_for_position(g) == 1000.)
+    assert(MinimaxPlayer("BLACK").get_points_for_position(g) == -1000.)
@@ -0,0 +1,41 @@
+"""
+Test the precomputed move tables.
+"""
+
+import pytest
+
+from Tables import KNIGHT_MOVES, KING_MOVES, PAWN_TAKES, PAWN_PUSHES, RAYS, \
+    ALL_POSITIONS, mask, sliding_attacks
+
+
+def test_table_sizes():
+    assert(len(ALL_POSITIONS)==64)
+    assert(sum(len(m) for m in KNIGHT_MOVES.values())==336)
+    assert(sum(len(m) for m in KING_MOVES.values())==420)
+
+
+def test_corners_and_edges():
+    assert(sorted(KNIGHT_MOVES[("A",1)])==[("B",3),("C",2)])
+    assert(sorted(KING_MOVES[("H",8)])==[("G",7),("G",8),("H",7)])
+    assert(PAWN_TAKES["WHITE"][("A",2)]==(("B",3),))
+    assert(sorted(PAWN_TAKES["BLACK"][("E",7)])==[("D",6),("F",6)])
+    assert(PAWN_PUSHES["BLACK"][("C",7)]==(("C",6),("C",5)))
+
+
+def test_rays():
+    assert(RAYS[("A",1)][(1,1)][-1]==("H",8))
+    assert(len(RAYS[("D",4)][(0,1)])==4)
+    assert(RAYS[("H",4)][(1,0)]==())
+
+
+def test_sliding_attacks_blocked():
+    occupied = mask([("D",6),("F",4)])
+    up, blocker = sliding_attacks(("D",4),(0,1),occupied)
+    assert(up==(("D",5),("D",6)))
+    assert(blocker==("D",6))
+    left, blocker = sliding_attacks(("H",4),(-1,0),occupied)
+    assert(left==(("G",4),("F",4)))
+    assert(blocker==("F",4))
+    down, blocker = sliding_attacks(("D",4),(0,-1),occupied)
+    assert(len(down)==3)
+    assert(blocker is None)
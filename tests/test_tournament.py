@@ -0,0 +1,71 @@
+"""
+Test the headless tournament runner.
+"""
+
+import json
+import pytest
+
+from Tournament import parse_player, play_game, pairings, run_tournament, \
+    summarise
+
+
+def test_parse_player():
+    assert(parse_player("Random") == ("Random", {}))
+    assert(parse_player("AlphaBeta:depth=2,time_limit=0.5") ==
+           ("AlphaBeta", {"depth": 2, "time_limit": 0.5}))
+    with pytest.raises(RuntimeError):
+        parse_player("Nobody")
+
+
+def test_pairings():
+    games = pairings(["Random", "Minimax"], 2)
+    assert(len(games) == 4)
+    assert([g[:2] for g in games].count(("Random", "Minimax")) == 2)
+    assert(len(set(g[2] for g in games)) == 4)
+
+
+def test_play_game():
+    result = play_game("Random", "Random", max_plies=10, seed=3)
+    assert(result["plies"] <= 10)
+    assert(result["nodes"]["white"] == 0)
+    assert(result["time_per_move"]["white"] >= 0.)
+    ## same seed, same game
+    again = play_game("Random", "Random", max_plies=10, seed=3)
+    assert(again["history"] == result["history"])
+
+
+def test_play_game_mate():
+    fen = "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+    result = play_game("AlphaBeta:depth=1", "Random", fen=fen)
+    assert(result["winner"] == "WHITE")
+    assert(result["result"] == "checkmate")
+    assert(result["plies"] == 1)
+    assert(result["nodes"]["white"] > 0)
+
+
+def test_run_tournament(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    results = run_tournament(["Random", "AlphaBeta:depth=1"], games=1,
+                             max_plies=20, workers=2, output=output)
+    assert(len(results) == 2)
+    with open(output) as infile:
+        lines = [json.loads(line) for line in infile]
+    assert(sorted(r["seed"] for r in lines) == [0, 1])
+    points = summarise(results)
+    assert(sum(points.values()) == 2.)
+
+
+def test_run_tournament_error(tmp_path):
+    ## the random player takes no depth, so games with "Random:depth=2"
+    ## fail, but the others are still played and every game is reported
+    output = str(tmp_path / "results.jsonl")
+    results = run_tournament(["Random", "Random:depth=2", "AlphaBeta:depth=1"],
+                             games=1, max_plies=4, workers=2, output=output)
+    assert(len(results) == 6)
+    errors = [r for r in results if r["result"] == "error"]
+    assert(len(errors) == 4)
+    assert("TypeError" in errors[0]["error"])
+    with open(output) as infile:
+        assert(len(infile.readlines()) == 6)
+    assert(summarise(results)["Random:depth=2"] == 0.)
+    assert(sum(summarise(results).values()) == 2.)
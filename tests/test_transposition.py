@@ -0,0 +1,87 @@
+"""
+Test the transposition table, and its use by the minimax player.
+"""
+
+import pytest
+
+from Chess import Game
+from MoveChooser import MinimaxPlayer
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, \
+    SharedTranspositionTable, SHARED_ENTRY
+from Moves import str_to_move
+
+
+def test_store_and_probe():
+    tt = TranspositionTable(1)
+    tt.store(12345, 2, 1.5, EXACT, (("E",2),("E",4)))
+    entry = tt.probe(12345)
+    assert(entry[1]==2)
+    assert(entry[2]==1.5)
+    assert(entry[4]==(("E",2),("E",4)))
+    assert(tt.probe(54321) is None)
+
+
+def test_replacement():
+    tt = TranspositionTable(1)
+    key = 7
+    clash = key + tt.size
+    tt.store(key, 3, 0., EXACT, None)
+    ## shallower search of a different position doesn't replace...
+    tt.store(clash, 1, 0., LOWER_BOUND, None)
+    assert(tt.probe(key) is not None)
+    assert(tt.probe(clash) is None)
+    ## ...unless the stored one is from an earlier search
+    tt.new_search()
+    tt.store(clash, 1, 0., LOWER_BOUND, None)
+    assert(tt.probe(key) is None)
+    assert(tt.probe(clash) is not None)
+
+
+def test_memory_limit():
+    assert(abs(TranspositionTable(2).size - 2 * TranspositionTable(1).size) <= 1)
+
+
+def test_minimax_same_move_with_table():
+    g = Game()
+    g.move(("E",2),("E",4))
+    g.move(("D",7),("D",5))
+    with_tt = MinimaxPlayer("WHITE", depth=2)
+    without_tt = MinimaxPlayer("WHITE", depth=2, tt_size_mb=0)
+    history = g.get_history_str()
+    value = without_tt.minimax(g, 2, True)[0]
+    assert(with_tt.minimax(g, 2, True)[0] == value)
+    assert(with_tt.tt.hits == 0)
+    ## searching again, every reply should be found in the table
+    assert(with_tt.minimax(g, 2, True)[0] == value)
+    assert(with_tt.tt.hits == len(g.get_all_possible_moves("WHITE")))
+    assert(g.get_history_str() == history)
+
+
+def test_shared_table():
+    tt = SharedTranspositionTable(1)
+    try:
+        move = str_to_move("E2E4")
+        tt.store(2**64 - 1, 4, -0.25, LOWER_BOUND, move)
+        ## another table attached to the same memory sees the entry
+        other = SharedTranspositionTable(1, name=tt.name)
+        entry = other.probe(2**64 - 1)
+        other.close()
+        assert(entry[1:5] == (4, -0.25, LOWER_BOUND, move))
+        assert(tt.probe(12345) is None)
+        tt.store(5, 1, 0., EXACT, None)
+        assert(tt.probe(5)[4] is None)
+    finally:
+        tt.close(unlink=True)
+
+
+def test_shared_table_torn_entry():
+    tt = SharedTranspositionTable(1)
+    try:
+        key = 99
+        tt.store(key, 2, 1.5, EXACT, None)
+        ## an entry changed part way through being written is ignored
+        offset = (key % tt.size) * SHARED_ENTRY.size
+        tt.memory.buf[offset + 10] ^= 0xFF
+        assert(tt.probe(key) is None)
+    finally:
+        tt.close(unlink=True)